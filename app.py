@@ -1,16 +1,40 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_from_directory, flash
+from flask import Flask, render_template, request, redirect, url_for, session, send_from_directory, send_file, flash, Response, stream_with_context, jsonify
 import os
+import re
+import json
+import math
 import datetime
 import random
+import uuid
+import click
 
-from utils.data_handler import add_employee, delete_employee
-from utils.chart_generator import generate_all_charts
-from utils.pdf_generator import generate_payslip_pdf
+from utils.data_handler import add_employee, delete_employee, StaleDataError, cache_stats
+from utils.chart_generator import render_chart, chart_fingerprint, CHART_NAMES, CHART_FORMATS
+from utils.payslip_cache import cached_payslip_path, payslip_key
+from utils.render_pool import render_payslip, RenderBusy
 from utils.data_handler import load_data, save_data, find_employee_by_username, find_employee_by_code, update_employee
-from utils.salary_calculator import calculate_for_employee_record
+from utils.payroll_aggregates import aggregates_for
+from utils.employee_listing import list_employees
+from utils.employee_store import store_for
+from utils.payroll_records import payroll_breakdown, issue_payroll_records, current_period, parse_period
+from utils.bulk_payslips import generate_bulk_payslips, BULK_FOLDER
+from utils.bulk_io import iter_employee_rows, import_employees, iter_export, format_for_filename, FORMATS, IMPORT_BATCH_SIZE
+from utils.instrumentation import instrument_app, render_metrics
+from utils.salary_calculator import pay_cache_stats
+from utils.credentials import verify_login, LoginBusy, migrate_plaintext_passwords
+from utils.passwords import hash_password
+from utils.jobs import enqueue, get_job, list_jobs, purge_jobs, JobWorker, requeue_stale
+from utils.job_tasks import UPLOAD_FOLDER
+from utils.page_cache import page_cache, page_version, template_stamp
+from utils.payroll_reports import iter_report_csv, fiscal_year, check_ytd, REPORT_KINDS
+from utils.simulation import simulate
 
 app = Flask(__name__)
 app.secret_key = "vaidy-payroll-key"  # change later for production
+# "stream": payslip PDFs rendered in memory per download; "file": cached under static/payslips
+app.config["PAYSLIP_PDF_MODE"] = os.environ.get("PAYROLL_PAYSLIP_PDF_MODE", "stream")
+# per-route latency, spans, Server-Timing header and opt-in cProfile (see utils/instrumentation.py)
+instrument_app(app, show_timing=lambda: session.get('user_role') == 'admin')
 
 # Folder setup for generated files
 if not os.path.exists("static/payslips"):
@@ -31,20 +55,22 @@ def login():
         username = request.form.get('username').strip()
         password = request.form.get('password').strip()
 
-        data = load_data()
-        # Admin login
-        admin = data.get("logins", {}).get("admin", {})
-        if username == admin.get("username") and password == admin.get("password"):
+        # hashed-password check on the bounded verification pool, via the username index
+        try:
+            credential = verify_login(username, password)
+        except LoginBusy:
+            flash("Too many logins right now, please try again in a moment.", "error")
+            return render_template('login.html'), 503
+
+        if credential and credential["kind"] == "admin":
             session['user_role'] = 'admin'
             session['username'] = username
             return redirect(url_for('admin_dashboard'))
 
-        # Employee login
-        emp = find_employee_by_username(data, username)
-        if emp and emp.get("password") == password:
+        if credential and credential["kind"] == "employee":
             session['user_role'] = 'employee'
             session['username'] = username
-            session['emp_code'] = emp.get("code")
+            session['emp_code'] = credential["code"]
             return redirect(url_for('employee_dashboard'))
 
         flash("Invalid username or password!", "error")
@@ -65,46 +91,87 @@ def admin_dashboard():
         return redirect(url_for('login'))
 
     data = load_data()
-    employees = data.get("employees", [])
     roles = data.get("roles", {})
 
-    # --- Build data for charts ---
-    from collections import defaultdict
-    role_totals = defaultdict(float)
-    total_pf = total_tax = total_loan = 0
-    months, expenses = [], []
-
-    for emp in employees:
-        breakdown, _ = calculate_for_employee_record(emp, roles)
-        role_totals[emp["role"]] += breakdown["grosspay"]
-        total_pf += breakdown["pf"]
-        total_tax += breakdown["tax"]
-        total_loan += breakdown["loan_debit"]
-
-    count = len(employees)
-    payroll_history = sorted(data.get("payroll_history", []), key=lambda x: x["month"])
-    for h in payroll_history:
-        months.append(h["month"])
-        expenses.append(h["total_expense"])
-
-    charts_data = {
-        "roles": list(role_totals.keys()),
-        "roleTotals": list(role_totals.values()),
-        "avgPF": round(total_pf / count, 2),
-        "avgTax": round(total_tax / count, 2),
-        "avgLoan": round(total_loan / count, 2),
-        "months": months,
-        "expenses": expenses
-    }
+    # --- Chart data from the incrementally maintained aggregates ---
+    charts_data = aggregates_for(data).charts_data()
 
+    # employee rows are fetched page by page from /api/employees
     return render_template(
         'admin_dashboard.html',
-        employees=employees,
         roles=roles,
+        departments=sorted(d for d in store_for(data).departments() if d),
         charts_data=charts_data
     )
 
 
+# ---------------------- EMPLOYEE LISTING API ----------------------
+@app.route('/api/employees')
+def employees_api():
+    if 'user_role' not in session or session['user_role'] != 'admin':
+        return jsonify({"error": "unauthorized"}), 401
+
+    try:
+        page = list_employees(
+            load_data(),
+            roles=request.args.getlist("role"),
+            department=request.args.get("department") or None,
+            q=request.args.get("q"),
+            sort=request.args.get("sort", "code"),
+            descending=request.args.get("order") == "desc",
+            limit=request.args.get("limit", 50, type=int),
+            cursor=request.args.get("cursor") or None,
+        )
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(page)
+
+
+# ---------------------- SERVER-RENDERED CHARTS ----------------------
+@app.route('/charts/<name>.<fmt>')
+def chart_image(name, fmt):
+    if 'user_role' not in session or session['user_role'] != 'admin':
+        return redirect(url_for('login'))
+    if name not in CHART_NAMES or fmt not in CHART_FORMATS:
+        return not_found(None)
+
+    charts_data = aggregates_for(load_data()).charts_data()
+    etag = chart_fingerprint(name, charts_data, fmt)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(render_chart(name, charts_data, fmt), mimetype=CHART_FORMATS[fmt])
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+# ---------------------- PAGE CACHE ----------------------
+def _cached_page(page, template, data, emp, breakdown, **context):
+    """
+    Render `template` for one employee through the page cache: the version
+    (also the ETag) covers everything the page shows, so an unchanged page is
+    a 304 or a cached body and never re-rendered.
+    """
+    page_cache.watch(data)
+    version = page_version(page, emp, breakdown, current_period(),
+                           template=template_stamp(app.jinja_env, template),
+                           viewer=session.get('user_role'), **context)
+    if request.if_none_match.contains(version):
+        response = Response(status=304)
+        response.set_etag(version)
+        return response
+
+    entry = page_cache.get(page, emp["code"], version, role=emp.get("role"))
+    if entry is None:
+        body = render_template(template, employee=emp, breakdown=breakdown, **context).encode("utf-8")
+        entry = page_cache.put(page, emp["code"], version, body, role=emp.get("role"))
+    response = Response(entry.body, mimetype="text/html")
+    response.set_etag(entry.etag)
+    response.last_modified = datetime.datetime.fromtimestamp(entry.last_modified, datetime.timezone.utc)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
 # ---------------------- EMPLOYEE DASHBOARD ----------------------
 @app.route('/employee')
 def employee_dashboard():
@@ -116,34 +183,90 @@ def employee_dashboard():
     if not emp:
         return redirect(url_for('logout'))
 
-    # Auto calculate salary for this month
-    breakdown, updated = calculate_for_employee_record(emp, roles_dict=data.get("roles", {}))
-    update_employee(data, updated)
-    save_data(data)
-    return render_template('employee_dashboard.html', employee=updated, breakdown=breakdown)
+    # This month's issued payroll record, or a read-only preview before the pay run
+    breakdown = payroll_breakdown(data, emp)
+    return _cached_page("employee_dashboard", 'employee_dashboard.html', data, emp, breakdown)
 
 # ---------------------- VIEW PAYSLIP (HTML VERSION) ----------------------
+def _may_view_payslip(emp) -> bool:
+    """Admins see every payslip, an employee only their own."""
+    if session.get('user_role') == 'admin':
+        return True
+    return (session.get('user_role') == 'employee' and emp is not None
+            and emp.get("username") == session.get('username'))
+
 @app.route('/payslip/<int:emp_code>')
 def payslip_view(emp_code):
     data = load_data()
     emp = find_employee_by_code(data, emp_code)
+    if 'user_role' not in session:
+        return redirect(url_for('login'))
+    if not _may_view_payslip(emp):
+        return forbidden(None)
     if not emp:
         flash("Employee not found!", "error")
         return redirect(url_for('admin_dashboard'))
 
-    breakdown, _ = calculate_for_employee_record(emp, roles_dict=data.get("roles", {}))
-    pdf_path = generate_payslip_pdf(emp, breakdown)
-    pdf_filename = os.path.basename(pdf_path)
-
-    return render_template(
+    breakdown = payroll_breakdown(data, emp)
+    if app.config["PAYSLIP_PDF_MODE"] == "stream":
+        # rendered on demand by payslip_pdf, nothing written to disk
+        pdf_url = url_for('payslip_pdf', emp_code=emp_code)
+    else:
+        pdf_path = cached_payslip_path(emp, breakdown, current_period())
+        if os.path.exists(pdf_path):
+            pdf_url = url_for('download_payslip', filename=os.path.basename(pdf_path))
+        else:
+            # render in the background; the link serves the file once the job is done
+            job = enqueue("payslip_pdf", {"code": emp_code, "period": current_period()}, owner=session.get('username'))
+            pdf_url = url_for('job_result', job_id=job["id"])
+
+    return _cached_page(
+        "payslip",
         'payslip.html',
-        employee=emp,
-        breakdown=breakdown,
+        data,
+        emp,
+        breakdown,
         date=datetime.date.today(),
-        pdf_filename=pdf_filename
+        pdf_url=pdf_url
     )
 
+# ---------------------- PAYSLIP PDF (STREAMED) ----------------------
+@app.route('/payslip/<int:emp_code>/pdf')
+def payslip_pdf(emp_code):
+    data = load_data()
+    emp = find_employee_by_code(data, emp_code)
+    if not _may_view_payslip(emp):
+        return forbidden(None)
+    if not emp:
+        return not_found(None)
+
+    period = current_period()
+    breakdown = payroll_breakdown(data, emp)
+    # the content hash doubles as ETag: revalidation needs no rendering
+    etag = payslip_key(emp, breakdown, period)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(render_payslip(emp, breakdown), mimetype="application/pdf")
+        response.headers["Content-Disposition"] = f'attachment; filename="Payslip_{emp_code}_{period}.pdf"'
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
 # ---------------------- ADD EMPLOYEE ----------------------
+def _employee_form_numbers(form) -> dict:
+    """exp, working_hours and loan_balance from the employee form, each finite and >= 0 (raises ValueError)."""
+    numbers = {}
+    for field, cast in (("exp", int), ("working_hours", float), ("loan_balance", float)):
+        try:
+            value = cast(form.get(field, ""))
+        except ValueError:
+            raise ValueError(f"{field} must be a number") from None
+        if not math.isfinite(value) or value < 0:
+            raise ValueError(f"{field} must be a finite number, 0 or more")
+        numbers[field] = value
+    return numbers
+
 @app.route("/employee/add", methods=["GET", "POST"])
 def add_employee_route():
     if 'user_role' not in session or session['user_role'] != 'admin':
@@ -153,15 +276,21 @@ def add_employee_route():
     roles = list(data.get("roles", {}).keys())
 
     if request.method == "POST":
+        try:
+            numbers = _employee_form_numbers(request.form)
+        except ValueError as e:
+            flash(str(e), "error")
+            return render_template("employee_form.html", action="Add", roles=roles, employee=request.form), 400
+        code = random.randint(1000, 9999)
+        while find_employee_by_code(data, code):
+            code = random.randint(1000, 9999)
         emp = {
-            "code": random.randint(1000, 9999),
+            "code": code,
             "name": request.form["name"],
             "username": request.form["username"],
-            "password": request.form["password"],
+            "password": hash_password(request.form["password"]),
             "role": request.form["role"],
-            "exp": int(request.form["exp"]),
-            "working_hours": float(request.form["working_hours"]),
-            "loan_balance": float(request.form["loan_balance"]),
+            **numbers,
             "department": request.form.get("department", "General")
         }
         add_employee(data, emp)
@@ -186,17 +315,22 @@ def edit_employee(emp_code):
         return redirect(url_for("admin_dashboard"))
 
     if request.method == "POST":
-        emp.update({
+        try:
+            numbers = _employee_form_numbers(request.form)
+        except ValueError as e:
+            flash(str(e), "error")
+            return render_template("employee_form.html", action="Edit", roles=roles, employee=request.form), 400
+        changes = {
             "name": request.form["name"],
             "username": request.form["username"],
-            "password": request.form["password"],
             "role": request.form["role"],
-            "exp": int(request.form["exp"]),
-            "working_hours": float(request.form["working_hours"]),
-            "loan_balance": float(request.form["loan_balance"]),
+            **numbers,
             "department": request.form.get("department", emp.get("department", "General"))
-        })
-        update_employee(data, emp)
+        }
+        if request.form.get("password"):
+            changes["password"] = hash_password(request.form["password"])  # blank keeps the current one
+        # a new record: the cached one stays untouched if the update fails
+        update_employee(data, {**dict(emp), **changes})
         save_data(data)
         flash("Employee details updated!", "success")
         return redirect(url_for("admin_dashboard"))
@@ -218,12 +352,326 @@ def delete_employee_route(emp_code):
 
 
 # ---------------------- STATIC PDF DOWNLOAD (placeholder) ----------------------
-@app.route('/download/<path:filename>')
+@app.route('/download/<filename>')  # flat payslip cache files only, no subfolders
 def download_payslip(filename):
     return send_from_directory("static/payslips", filename, as_attachment=True)
 
 
+# ---------------------- PAY RUN ----------------------
+def _payrun_message(summary):
+    if summary["already_run"]:
+        return f"{summary['period']}: already completed on {summary['completed_at']} ({summary['employees']} employees)"
+    return (f"{summary['period']}: issued {summary['issued']} payroll records, total expense "
+            f"₹{summary['total_expense']}, {summary['elapsed_seconds']}s "
+            f"({summary['employees_per_second']} employees/sec)")
+
+@app.route("/admin/payrun", methods=["POST"])
+def payrun_route():
+    if 'user_role' not in session or session['user_role'] != 'admin':
+        return jsonify({"error": "unauthorized"}), 401
+
+    try:
+        period = parse_period(request.form.get("month") or current_period())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(issue_payroll_records(load_data(), period))
+
+@app.cli.command("payrun")
+@click.option("--month", default=None, help="Pay period as YYYY-MM (default: current month)")
+def payrun_command(month):
+    """Run the month-end payroll: records, loan debits and payroll_history, in one save."""
+    try:
+        period = parse_period(month or current_period())
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--month")
+    summary = issue_payroll_records(load_data(), period)
+    click.echo(_payrun_message(summary))
+
+@app.cli.command("hash-passwords")
+def hash_passwords_command():
+    """Replace every plaintext password (employees and admin logins) with a PBKDF2 hash."""
+    summary = migrate_plaintext_passwords(load_data())
+    click.echo(f"hashed {summary['employees']} employee and {summary['logins']} login passwords")
+
+@app.cli.command("check-aggregates")
+def check_aggregates_command():
+    """Recompute the dashboard totals from scratch and report any drift."""
+    drift = aggregates_for(load_data()).check_drift()
+    for line in drift:
+        click.echo(line)
+    click.echo("aggregates consistent" if not drift else f"{len(drift)} aggregate(s) drifted")
+
+
+# ---------------------- YTD / STATUTORY REPORTS ----------------------
+@app.route("/admin/reports/ytd.csv")
+def ytd_report_route():
+    if 'user_role' not in session or session['user_role'] != 'admin':
+        return redirect(url_for('login'))
+
+    fy = request.args.get("fy") or fiscal_year(current_period())
+    by = request.args.get("by", "employee")
+    if not re.fullmatch(r"\d{4}-\d{2}", fy) or by not in REPORT_KINDS:
+        return not_found(None)
+    response = Response(stream_with_context(iter_report_csv(load_data(), fy, by)), mimetype="text/csv")
+    response.headers["Content-Disposition"] = f'attachment; filename="ytd_{by}_{fy}.csv"'
+    return response
+
+@app.cli.command("ytd-report")
+@click.option("--fy", default=None, help="Fiscal year as YYYY-YY, April to March (default: current)")
+@click.option("--by", "by", default="employee", type=click.Choice(REPORT_KINDS), help="Report rows")
+@click.argument("path")
+def ytd_report_command(fy, by, path):
+    """Write a year-to-date report (per employee, per department or month by month) as CSV."""
+    fy = fy or fiscal_year(current_period())
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in iter_report_csv(load_data(), fy, by):
+            f.write(chunk)
+    click.echo(f"{by} report for {fy} written to {path}")
+
+@app.cli.command("check-ytd")
+@click.option("--fy", default=None, help="Fiscal year as YYYY-YY (default: current)")
+def check_ytd_command(fy):
+    """Recompute a fiscal year's YTD totals from the payroll records and report any drift."""
+    drift = check_ytd(load_data(), fy or fiscal_year(current_period()))
+    for line in drift:
+        click.echo(line)
+    click.echo("ytd totals consistent" if not drift else f"{len(drift)} ytd total(s) drifted")
+
+# ---------------------- WHAT-IF SIMULATION ----------------------
+@app.route("/admin/simulate", methods=["POST"])
+def simulate_route():
+    if 'user_role' not in session or session['user_role'] != 'admin':
+        return jsonify({"error": "unauthorized"}), 401
+
+    body = request.get_json(silent=True)
+    scenarios = body.get("scenarios") if isinstance(body, dict) else body
+    if not isinstance(scenarios, list):
+        return jsonify({"error": "send a JSON list of scenarios (or {\"scenarios\": [...]})"}), 400
+    try:
+        return jsonify(simulate(load_data(), scenarios))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.cli.command("simulate")
+@click.argument("path")
+@click.option("--workers", default=None, type=int, help="Processes for the scenarios (default: in process unless the simulation is very large)")
+def simulate_command(path, workers):
+    """Compare payroll cost under the scenarios in a JSON file with the current policy (nothing is saved)."""
+    with open(path, "r", encoding="utf-8") as f:
+        scenarios = json.load(f)
+    if isinstance(scenarios, dict):
+        scenarios = scenarios.get("scenarios", [])
+    result = simulate(load_data(), scenarios, workers=workers)
+    for scenario in result["scenarios"]:
+        total = scenario["total"]
+        click.echo(f"{scenario['name']}: cost {total['cost']['scenario']} ({total['cost']['delta']:+d}), "
+                   f"netpay {total['netpay']['scenario']} ({total['netpay']['delta']:+d})")
+        for role, metrics in scenario["roles"].items():
+            if metrics["cost"]["delta"]:
+                click.echo(f"  {role}: cost {metrics['cost']['delta']:+d} ({metrics['cost']['delta_pct']}%)")
+    click.echo(f"{len(result['scenarios'])} scenario(s) over {result['employees']} employees "
+               f"in {result['elapsed_seconds']}s ({result['workers']} worker(s))")
+
+# ---------------------- BULK IMPORT / EXPORT ----------------------
+@app.route("/admin/import", methods=["POST"])
+def import_employees_route():
+    if 'user_role' not in session or session['user_role'] != 'admin':
+        return jsonify({"error": "unauthorized"}), 401
+
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"error": "upload a CSV or JSONL file as 'file'"}), 400
+
+    try:
+        fmt = request.form.get("format") or format_for_filename(upload.filename)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be {' or '.join(FORMATS)}"}), 400
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    path = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4().hex}.{fmt}")
+    upload.save(path)
+    job = enqueue("import_employees", {"path": path, "format": fmt}, owner=session.get('username'))
+    return _job_accepted(job)
+
+@app.route("/admin/export/employees.<fmt>")
+def export_employees_route(fmt):
+    if 'user_role' not in session or session['user_role'] != 'admin':
+        return redirect(url_for('login'))
+    if fmt not in FORMATS:
+        return not_found(None)
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    response = Response(stream_with_context(iter_export(load_data(), fmt)), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="employees.{fmt}"'
+    return response
+
+@app.cli.command("import-employees")
+@click.argument("path")
+@click.option("--batch-size", default=IMPORT_BATCH_SIZE, help="Rows per save")
+def import_employees_command(path, batch_size):
+    """Stream employees from a CSV or JSONL file into the store."""
+    try:
+        fmt = format_for_filename(path)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="PATH")
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        summary = import_employees(load_data(), iter_employee_rows(f, fmt), batch_size=batch_size)
+    click.echo(f"imported {summary['imported']}, rejected {summary['rejected']} in {summary['batches']} batch(es)")
+    for error in summary["errors"]:
+        click.echo(f"  line {error['line']}: {error['error']}")
+
+@app.cli.command("export-employees")
+@click.argument("path")
+def export_employees_command(path):
+    """Stream every employee with their breakdown to a CSV or JSONL file."""
+    try:
+        fmt = format_for_filename(path)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="PATH")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in iter_export(load_data(), fmt):
+            f.write(chunk)
+    click.echo(f"exported to {path}")
+
+
+# ---------------------- BULK PAYSLIPS ----------------------
+def _bulk_progress_line(event):
+    if not event["finished"]:
+        return f"{event['done']}/{event['total']} payslips ({event['elapsed']}s)\n"
+    lines = [f"Done: {event['rendered']} rendered, {event['skipped']} already present, "
+             f"{event['elapsed']}s, {event['pdfs_per_sec']} PDFs/sec"]
+    for pid, rate in event["workers"].items():
+        lines.append(f"  worker {pid}: {rate} PDFs/sec")
+    if event["zip_path"]:
+        lines.append(f"ZIP: {event['zip_path']}")
+    return "\n".join(lines) + "\n"
+
+@app.route("/admin/payslips/bulk", methods=["POST"])
+def bulk_payslips_route():
+    if 'user_role' not in session or session['user_role'] != 'admin':
+        return redirect(url_for('login'))
+
+    try:
+        period = parse_period(request.form.get("month") or current_period())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    job = enqueue("bulk_payslips", {"period": period, "zip": bool(request.form.get("zip"))},
+                  owner=session.get('username'))
+    return _job_accepted(job)
+
+@app.cli.command("bulk-payslips")
+@click.option("--month", default=None, help="Pay period as YYYY-MM (default: current month)")
+@click.option("--workers", default=None, type=int, help="Worker processes (default: CPU count)")
+@click.option("--zip", "zip_path", default=None, help="Also bundle all PDFs into this ZIP file")
+def bulk_payslips_command(month, workers, zip_path):
+    """Render every employee's payslip PDF in parallel (resumable)."""
+    try:
+        period = parse_period(month or current_period())
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--month")
+    for event in generate_bulk_payslips(load_data(), period, workers=workers, zip_path=zip_path):
+        click.echo(_bulk_progress_line(event), nl=False)
+
+
+# ---------------------- BACKGROUND JOBS ----------------------
+def _job_accepted(job):
+    response = jsonify(job)
+    response.status_code = 202
+    response.headers["Location"] = url_for('job_status', job_id=job["id"])
+    return response
+
+def _job_visible(job) -> bool:
+    return session.get('user_role') == 'admin' or job["owner"] == session.get('username')
+
+@app.route("/admin/jobs", methods=["GET", "POST"])
+def jobs_route():
+    if 'user_role' not in session or session['user_role'] != 'admin':
+        return jsonify({"error": "unauthorized"}), 401
+    if request.method == "GET":
+        return jsonify(list_jobs(request.args.get("status"), request.args.get("limit", 50, type=int)))
+
+    kind = request.form.get("kind")
+    if kind not in ("bulk_payslips", "charts", "payrun"):
+        return jsonify({"error": "kind must be bulk_payslips, charts or payrun"}), 400
+    try:
+        params = {"period": parse_period(request.form.get("month") or current_period())}
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if kind == "bulk_payslips":
+        params["zip"] = bool(request.form.get("zip"))
+    elif kind == "charts":
+        params = {}
+    return _job_accepted(enqueue(kind, params, owner=session.get('username')))
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None or not _job_visible(job):
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>/result")
+def job_result(job_id):
+    job = get_job(job_id)
+    if job is None or not _job_visible(job):
+        return jsonify({"error": "job not found"}), 404
+    if job["status"] in ("queued", "running"):
+        response = jsonify({"id": job_id, "status": job["status"], "progress": job["progress"]})
+        response.status_code = 202
+        response.headers["Retry-After"] = "1"
+        return response
+    if job["status"] == "failed":
+        return jsonify({"id": job_id, "status": "failed", "error": job["error"]}), 500
+
+    result = job["result"] or {}
+    path = result.get("file")
+    if not path:
+        return jsonify(result)
+    real = os.path.realpath(path)
+    roots = [os.path.realpath(app.static_folder), os.path.realpath(BULK_FOLDER)]
+    if not any(os.path.commonpath([root, real]) == root for root in roots) or not os.path.exists(real):
+        return jsonify({"error": "result file is gone, run the job again"}), 410
+    return send_file(real, mimetype=result.get("mimetype"), as_attachment=True)
+
+@app.cli.command("jobs-worker")
+@click.option("--threads", default=1, type=int, help="Jobs run in parallel by this process")
+def jobs_worker_command(threads):
+    """Run background jobs from the queue until interrupted."""
+    requeue_stale()
+    workers = [JobWorker() for _ in range(max(1, threads))]
+    for worker in workers:
+        worker.start()
+    click.echo(f"{len(workers)} job worker(s) running, Ctrl+C to stop")
+    try:
+        while any(w.is_alive() for w in workers):
+            workers[0].join(1.0)
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.stop()
+
+@app.cli.command("purge-jobs")
+@click.option("--days", default=7, type=float, help="Delete finished jobs older than this")
+def purge_jobs_command(days):
+    """Delete old finished jobs from the queue database."""
+    click.echo(f"deleted {purge_jobs(days)} jobs")
+
+
+# ---------------------- METRICS ----------------------
+@app.route("/metrics")
+def metrics():
+    stats = cache_stats()
+    gauges = {f"payroll_data_cache_{name}": value for name, value in stats.items()}
+    gauges.update({f"payroll_pay_cache_{name}": value for name, value in pay_cache_stats().items()})
+    gauges.update({f"payroll_page_cache_{name}": value for name, value in page_cache.cache_stats().items()})
+    return Response(render_metrics(gauges), mimetype="text/plain; version=0.0.4")
+
+
 # ---------------------- ERROR HANDLERS ----------------------
+@app.errorhandler(403)
+def forbidden(e):
+    return "<h1>403 - Forbidden</h1>", 403
+
 @app.errorhandler(404)
 def not_found(e):
     return "<h1>404 - Page Not Found</h1>", 404
@@ -232,6 +680,17 @@ def not_found(e):
 def server_error(e):
     return "<h1>500 - Server Error</h1>", 500
 
+@app.errorhandler(RenderBusy)
+def render_busy(e):
+    # every render process is busy and the queue is full: shed load instead of piling up
+    return "<h1>503 - Busy, please retry</h1>", 503, {"Retry-After": "2"}
+
+@app.errorhandler(StaleDataError)
+def stale_data(e):
+    # another worker saved first; the cache was dropped, so a retry sees fresh data
+    flash("Data was changed by someone else, please try again.", "error")
+    return redirect(request.referrer or url_for('home'))
+
 # ---------------------- MAIN ----------------------
 if __name__ == '__main__':
     app.run(debug=True)
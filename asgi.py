@@ -0,0 +1,13 @@
+# asgi.py
+# ASGI entry point: the Flask app behind utils/asgi_bridge.py, for servers
+# such as uvicorn (not in requirements.txt):
+#
+#   uvicorn asgi:application --port 8000
+#   PAYROLL_RENDER_PROCESSES=2 uvicorn asgi:application   # PDFs in worker processes
+#
+# `flask run` / gunicorn keep serving app:app as before.
+
+from app import app
+from utils.asgi_bridge import WsgiToAsgi
+
+application = WsgiToAsgi(app)
@@ -0,0 +1,291 @@
+# benchmark.py
+# Performance benchmarks on synthetic data: salary calculator, JSON storage,
+# lookups, payslip PDFs, charts and the main Flask routes, plus the memory
+# taken by the loaded document.
+# Works on a temporary copy of the data, never on data/employees.json.
+#
+#   python benchmark.py                                  # 1k / 10k / 100k employees
+#   python benchmark.py --sizes 1000 --output bench.json
+#   python benchmark.py --baseline bench.json            # exit 1 on regressions
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_REPEAT = 5
+REGRESSION_THRESHOLD = 0.25  # slower than baseline by more than 25%
+CALCULATOR_SAMPLE = 10000   # scalar calculator calls timed per run
+LOOKUP_SAMPLE = 1000        # find_* calls timed per run
+
+DEPARTMENTS = ("Engineering", "Finance", "HR", "Operations", "Sales", "General")
+FIRST_NAMES = ("Aarav", "Diya", "Ishaan", "Kavya", "Rohan", "Sneha", "Vivaan", "Ananya", "Arjun", "Meera")
+LAST_NAMES = ("Sharma", "Patel", "Iyer", "Gupta", "Reddy", "Nair", "Singh", "Das", "Mehta", "Rao")
+
+def synthetic_document(base: dict, n: int, seed: int = 42) -> dict:
+    """A data document with n random employees across the roles of `base`."""
+    rng = random.Random(seed)
+    roles = base.get("roles", {})
+    role_names = list(roles.keys())
+    employees = []
+    for i in range(n):
+        role = rng.choice(role_names)
+        code = 100000 + i
+        employees.append({
+            "code": code,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "role": role,
+            "department": rng.choice(DEPARTMENTS),
+            "exp": rng.randint(0, 12),
+            "working_hours": roles[role].get("default_hours", 160) + rng.randint(-20, 20),
+            "loan_balance": rng.choice([0, 0, 0, rng.randint(1000, 200000)]),
+            "username": f"user{code}",
+            "password": "bench",
+        })
+    return {
+        "roles": roles,
+        "employees": employees,
+        "payroll_history": list(base.get("payroll_history", [])),
+        "logins": base.get("logins", {}),
+    }
+
+def timed(fn, repeat: int, setup=None) -> dict:
+    """Run fn() `repeat` times (after an optional untimed setup()) and summarize in milliseconds."""
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(runs), 4),
+        "min_ms": round(min(runs), 4),
+        "max_ms": round(max(runs), 4),
+        "runs": repeat,
+    }
+
+def per_call(result: dict, calls: int) -> dict:
+    """Add the per-call median in microseconds to a timed() result."""
+    result["calls"] = calls
+    result["per_call_us"] = round(result["median_ms"] * 1000 / calls, 3)
+    return result
+
+def _traced_bytes(build) -> int:
+    """Bytes still allocated by the object build() returns."""
+    tracemalloc.start()
+    try:
+        obj = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del obj
+    return current
+
+def bench_memory(n: int, base: dict) -> dict:
+    """
+    Resident size of a parsed document with n employees and one month of
+    issued payroll records: plain dicts with the derived pay fields stored
+    on every employee (old layout) vs. Employee / Breakdown records.
+    """
+    from utils.records import compact_document
+    from utils.salary_calculator import calculate_for_employee_record
+
+    doc = synthetic_document(base, n)
+    records, legacy = {}, []
+    for emp in doc["employees"]:
+        breakdown, _ = calculate_for_employee_record(emp, doc["roles"])
+        breakdown = breakdown.to_dict()
+        records[str(emp["code"])] = {"code": emp["code"], "period": "2025-01", "breakdown": breakdown}
+        legacy.append(dict(emp, salary=breakdown["basic"], **{k: breakdown[k] for k in (
+            "hra", "da", "pf", "tax", "meal_allowance", "medical_allowance", "transport_allowance",
+            "loan_debit", "grosspay", "effective_rate")}))
+    text = json.dumps(dict(doc, employees=legacy, payroll_records={"2025-01": records}))
+    del doc, records, legacy
+
+    dict_bytes = _traced_bytes(lambda: json.loads(text))
+    compact_bytes = _traced_bytes(lambda: compact_document(json.loads(text)))
+    return {
+        "document_dict_bytes": dict_bytes,
+        "document_compact_bytes": compact_bytes,
+        "per_employee_dict_bytes": round(dict_bytes / n),
+        "per_employee_compact_bytes": round(compact_bytes / n),
+        "saved_ratio": round(1 - compact_bytes / dict_bytes, 3),
+    }
+
+def bench_size(n: int, base: dict, workdir: str, repeat: int) -> dict:
+    from utils import data_handler
+    from utils.data_handler import load_data, save_data, find_employee_by_code, find_employee_by_username
+    from utils.salary_calculator import calculate_for_employee_record, calculate_batch
+    from utils.pdf_generator import generate_payslip_pdf
+    from utils import chart_generator
+    from app import app
+
+    data_handler.DATA_PATH = os.path.join(workdir, f"employees_{n}.json")
+    doc = synthetic_document(base, n)
+    with open(data_handler.DATA_PATH, "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+    data_handler.invalidate_cache()
+    del doc
+
+    results = {}
+    data = load_data()
+    roles = data.get("roles", {})
+    employees = data["employees"]
+    rng = random.Random(n)
+
+    # --- calculator ---
+    sample = employees[:CALCULATOR_SAMPLE]
+    results["calculate_for_employee_record"] = per_call(
+        timed(lambda: [calculate_for_employee_record(e, roles) for e in sample], repeat), len(sample))
+    results["calculate_batch"] = per_call(timed(lambda: calculate_batch(employees, roles), repeat), len(employees))
+
+    # --- storage ---
+    results["load_data_cold"] = timed(load_data, repeat, setup=data_handler.invalidate_cache)
+    results["load_data_cached"] = timed(load_data, repeat)
+    data = load_data()
+    results["save_data"] = timed(lambda: save_data(data), repeat)
+
+    # --- lookups ---
+    codes = [e["code"] for e in rng.sample(employees, min(LOOKUP_SAMPLE, len(employees)))]
+    usernames = [f"user{code}" for code in codes]
+    find_employee_by_code(data, codes[0])  # build the indexes outside the timing
+    results["find_employee_by_code"] = per_call(
+        timed(lambda: [find_employee_by_code(data, c) for c in codes], repeat), len(codes))
+    results["find_employee_by_username"] = per_call(
+        timed(lambda: [find_employee_by_username(data, u) for u in usernames], repeat), len(usernames))
+
+    # --- payslip PDF ---
+    emp = find_employee_by_code(data, codes[0])
+    breakdown, _ = calculate_for_employee_record(emp, roles)
+    pdf_folder = os.path.join(workdir, "payslips")
+    results["generate_payslip_pdf"] = timed(lambda: generate_payslip_pdf(emp, breakdown, pdf_folder), repeat)
+
+    # --- charts (cold render vs. cached bytes) ---
+    chart_folder = os.path.join(workdir, "charts")
+
+    def clear_chart_cache():
+        with chart_generator._chart_cache_lock:
+            chart_generator._chart_cache.clear()
+        shutil.rmtree(chart_folder, ignore_errors=True)
+    results["generate_all_charts"] = timed(lambda: chart_generator.generate_all_charts(data, chart_folder), repeat,
+                                           setup=clear_chart_cache)
+    results["generate_all_charts_cached"] = timed(lambda: chart_generator.generate_all_charts(data, chart_folder), repeat)
+
+    # --- routes through the Flask test client ---
+    app.config["TESTING"] = True
+    admin = app.test_client()
+    with admin.session_transaction() as s:
+        s["user_role"] = "admin"
+        s["username"] = "admin"
+    employee = app.test_client()
+    with employee.session_transaction() as s:
+        s["user_role"] = "employee"
+        s["username"] = usernames[0]
+        s["emp_code"] = codes[0]
+
+    routes = {
+        "GET /admin": (admin, "/admin"),
+        "GET /api/employees": (admin, "/api/employees?limit=50"),
+        "GET /api/employees?q": (admin, "/api/employees?q=ar&sort=name&limit=50"),
+        "GET /charts/salary_distribution.png": (admin, "/charts/salary_distribution.png"),
+        "GET /employee": (employee, "/employee"),
+        "GET /payslip/<code>": (admin, f"/payslip/{codes[0]}"),
+        "GET /payslip/<code>/pdf": (admin, f"/payslip/{codes[0]}/pdf"),
+    }
+    for name, (client, url) in routes.items():
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{name} returned {response.status_code}")
+        results[name] = timed(lambda: client.get(url), repeat)
+
+    data_handler.invalidate_cache()
+    results["memory"] = bench_memory(n, base)
+    return results
+
+def run(sizes, repeat: int) -> dict:
+    from utils import data_handler
+    from utils.data_handler import load_data
+
+    workdir = tempfile.mkdtemp(prefix="payroll-bench-")
+    # always JSON files in workdir, whatever PAYROLL_STORAGE says: nothing may reach the real database
+    data_handler.STORAGE_BACKEND = "json"
+    data_handler.SQLITE_PATH = os.path.join(workdir, "payroll.db")
+    base = load_data()
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "sizes": list(sizes),
+        },
+        "results": {},
+    }
+    try:
+        for n in sizes:
+            print(f"benchmarking {n} employees...", file=sys.stderr)
+            report["results"][str(n)] = bench_size(n, base, workdir, repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+def compare(report: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """Benchmarks whose median got slower than the baseline by more than `threshold`."""
+    regressions = []
+    for size, results in report["results"].items():
+        for name, result in results.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if "median_ms" not in result or not before or not before.get("median_ms"):
+                continue
+            ratio = result["median_ms"] / before["median_ms"]
+            result["baseline_median_ms"] = before["median_ms"]
+            result["ratio"] = round(ratio, 3)
+            if ratio > 1 + threshold:
+                regressions.append({"size": int(size), "benchmark": name, "median_ms": result["median_ms"],
+                                     "baseline_median_ms": before["median_ms"], "ratio": round(ratio, 3)})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Payroll performance benchmarks")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES),
+                        help="comma-separated employee counts (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per benchmark")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="allowed slowdown before a benchmark counts as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = run(sizes, max(1, args.repeat))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    for r in regressions:
+        print(f"REGRESSION {r['benchmark']} @ {r['size']}: {r['median_ms']}ms vs {r['baseline_median_ms']}ms "
+              f"(x{r['ratio']})", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
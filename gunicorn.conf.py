@@ -0,0 +1,22 @@
+# gunicorn.conf.py
+# Optional gunicorn settings:  gunicorn app:app
+# (gunicorn is not in requirements.txt; the app also runs with `flask run`.)
+#
+# With PAYROLL_PREWARM=1 the master imports the app and the heavy libraries
+# (matplotlib, ReportLab, NumPy) once before forking, so new workers start
+# with them already in memory. Job and login threads start lazily in each
+# worker, so nothing thread-bound is created before the fork.
+
+import os
+
+from utils.warmup import PREWARM_ENABLED
+
+bind = os.environ.get("PAYROLL_BIND", "127.0.0.1:8000")
+workers = int(os.environ.get("PAYROLL_WEB_WORKERS", "2"))
+preload_app = PREWARM_ENABLED
+
+def on_starting(server):
+    if PREWARM_ENABLED:
+        from utils.warmup import prewarm
+        timings = prewarm()
+        server.log.info("prewarmed in %.0f ms: %s", sum(timings.values()), timings)
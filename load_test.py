@@ -0,0 +1,253 @@
+# load_test.py
+# Load test: the same request mix against the sync server (threaded
+# Werkzeug, as `flask run`) and the ASGI mode (asgi.py under uvicorn),
+# reporting requests/sec, p50 / p99 latency and rejected (503) requests.
+# Each server runs in a subprocess on a temporary synthetic data file;
+# data/employees.json is never touched.
+#
+#   python load_test.py                                   # both modes, 10k employees
+#   python load_test.py --modes asgi --connections 500 --duration 30
+#   python load_test.py --output load.json
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_MODES = ("sync", "asgi")
+DEFAULT_EMPLOYEES = 10000
+DEFAULT_CONNECTIONS = 64
+DEFAULT_DURATION = 15.0
+DEFAULT_WARMUP = 2.0
+STARTUP_TIMEOUT = 60.0
+REQUEST_TIMEOUT = 30.0  # counted as status 0
+
+# (weight, user, path template): mostly dashboards, some PDF downloads
+REQUEST_MIX = (
+    (40, "employee", "/employee"),
+    (25, "admin", "/payslip/{code}"),
+    (20, "admin", "/api/employees?limit=50&offset={offset}"),
+    (10, "admin", "/admin"),
+    (5, "admin", "/payslip/{code}/pdf"),
+)
+
+# ---------------------- SERVERS ----------------------
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def serve(mode: str, data_path: str, port: int):
+    """Subprocess entry point: run the app on data_path in the given mode."""
+    from utils import data_handler
+    data_handler.DATA_PATH = data_path
+    if mode == "sync":
+        from werkzeug.serving import run_simple
+        from app import app
+        run_simple("127.0.0.1", port, app, threaded=True)
+    elif mode == "asgi":
+        import uvicorn  # optional dependency of the ASGI mode
+        from asgi import application
+        uvicorn.run(application, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    else:
+        raise SystemExit(f"unknown mode {mode!r}")
+
+def start_server(mode: str, data_path: str) -> tuple:
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", mode,
+                             "--data", data_path, "--port", str(port)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{mode} server exited with {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return proc, port
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not start within {STARTUP_TIMEOUT}s")
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+# ---------------------- CLIENT ----------------------
+def session_cookies(codes: list) -> dict:
+    """Signed Flask session cookies for an admin and an employee, no login round trip."""
+    from app import app
+    serializer = app.session_interface.get_signing_serializer(app)
+    employee_code = codes[0]
+    return {
+        "admin": serializer.dumps({"user_role": "admin", "username": "admin"}),
+        "employee": serializer.dumps({"user_role": "employee", "username": f"user{employee_code}",
+                                      "emp_code": employee_code}),
+    }
+
+async def _read_response(reader) -> tuple:
+    """(status, keep_alive) after reading one HTTP/1.x response, body included."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    version, status = status_line.split(b" ", 2)[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    else:
+        await reader.read()
+        return int(status), False
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" and (version == b"HTTP/1.1" or connection == "keep-alive")
+    return int(status), keep_alive
+
+async def _connection(port: int, requests, deadline: float, record):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        path, cookie = next(requests)
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+                         f"Cookie: session={cookie}\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            status, keep_alive = await asyncio.wait_for(_read_response(reader), REQUEST_TIMEOUT)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, OSError):
+            status, keep_alive = 0, False
+        record(status, time.perf_counter() - started)
+        if not keep_alive and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+def _request_stream(codes: list, cookies: dict, seed: int):
+    rng = random.Random(seed)
+    weights = [w for w, _, _ in REQUEST_MIX]
+    while True:
+        _, user, template = rng.choices(REQUEST_MIX, weights)[0]
+        path = template.format(code=rng.choice(codes) if user == "admin" else codes[0],
+                               offset=rng.randrange(0, max(1, len(codes) - 50)))
+        yield path, cookies[user]
+
+async def _drive(port: int, codes: list, cookies: dict, connections: int, duration: float) -> dict:
+    latencies, statuses = [], {}
+
+    def record(status, seconds):
+        latencies.append(seconds)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(_connection(port, _request_stream(codes, cookies, i), deadline, record)
+                           for i in range(connections)))
+    elapsed = time.perf_counter() - started
+    return {"latencies": latencies, "statuses": statuses, "elapsed": elapsed}
+
+def summarize(raw: dict) -> dict:
+    latencies = sorted(raw["latencies"])
+    ok = raw["statuses"].get(200, 0)
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+    return {
+        "requests": len(latencies),
+        "ok": ok,
+        "rejected_503": raw["statuses"].get(503, 0),
+        "errors": sum(n for status, n in raw["statuses"].items() if status not in (200, 503)),
+        "statuses": {str(k): v for k, v in sorted(raw["statuses"].items())},
+        "requests_per_sec": round(len(latencies) / raw["elapsed"], 1),
+        "ok_per_sec": round(ok / raw["elapsed"], 1),
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+    }
+
+def run_mode(mode: str, data_path: str, codes: list, cookies: dict, connections: int,
+             duration: float, warmup: float) -> dict:
+    proc, port = start_server(mode, data_path)
+    try:
+        if warmup > 0:
+            asyncio.run(_drive(port, codes, cookies, min(connections, 8), warmup))
+        return summarize(asyncio.run(_drive(port, codes, cookies, connections, duration)))
+    finally:
+        stop_server(proc)
+
+# ---------------------- MAIN ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync vs. ASGI load test")
+    parser.add_argument("--modes", default=",".join(DEFAULT_MODES), help="comma-separated: sync, asgi")
+    parser.add_argument("--employees", type=int, default=DEFAULT_EMPLOYEES, help="synthetic workforce size")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="seconds per mode")
+    parser.add_argument("--warmup", type=float, default=DEFAULT_WARMUP, help="untimed seconds before each run")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve, args.data, args.port)
+        return 0
+
+    from benchmark import synthetic_document
+    from utils.data_handler import load_data
+
+    workdir = tempfile.mkdtemp(prefix="payroll-load-")
+    try:
+        doc = synthetic_document(load_data(), args.employees)
+        codes = [emp["code"] for emp in doc["employees"]]
+        data_path = os.path.join(workdir, "employees.json")
+        with open(data_path, "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+        cookies = session_cookies(codes)
+
+        report = {"employees": args.employees, "connections": args.connections,
+                  "duration": args.duration, "results": {}}
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            print(f"load testing {mode} ({args.connections} connections, {args.duration:g}s)...", file=sys.stderr)
+            report["results"][mode] = run_mode(mode, data_path, codes, cookies, args.connections,
+                                               args.duration, args.warmup)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    for mode, result in report["results"].items():
+        print(f"{mode:>5}: {result['requests_per_sec']} req/s, p50 {result['p50_ms']} ms, "
+              f"p99 {result['p99_ms']} ms, 503s {result['rejected_503']}, errors {result['errors']}",
+              file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
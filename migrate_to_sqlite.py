@@ -0,0 +1,24 @@
+# migrate_to_sqlite.py
+# One-shot conversion of data/employees.json into the SQLite backend.
+# Afterwards run the app with PAYROLL_STORAGE=sqlite.
+#
+#   python migrate_to_sqlite.py [json_path] [db_path] [--force]
+
+import sys
+
+from utils.data_handler import DATA_PATH, SQLITE_PATH
+from utils.sqlite_backend import migrate_json
+
+def main():
+    args = [a for a in sys.argv[1:] if a != "--force"]
+    json_path = args[0] if len(args) > 0 else DATA_PATH
+    db_path = args[1] if len(args) > 1 else SQLITE_PATH
+
+    counts = migrate_json(json_path, db_path, force="--force" in sys.argv)
+    print(f"Migrated {json_path} -> {db_path}")
+    for table, count in counts.items():
+        print(f"  {table}: {count}")
+    print("Start the app with PAYROLL_STORAGE=sqlite to use it.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# run_batch_test.py
+# Check that the vectorized calculate_batch() gives exactly the same
+# breakdown as calculate_for_employee_record() for every employee.
+# Read-only: never saves anything back to data/employees.json.
+
+import random
+
+from utils.data_handler import load_data
+from utils.salary_calculator import calculate_for_employee_record, calculate_batch, batch_breakdown
+
+def synthetic_employees(roles: dict, n: int = 5000, seed: int = 7) -> list:
+    """Random employees covering every experience band, unknown roles and loan edge cases."""
+    rng = random.Random(seed)
+    role_names = list(roles.keys()) + ["Unknown Role"]
+    employees = []
+    for i in range(n):
+        employees.append({
+            "code": 10000 + i,
+            "role": rng.choice(role_names),
+            "exp": rng.randint(-1, 12),
+            "working_hours": rng.choice([0, 1, 37.5, 140, 150, 155, 160, 170, 180, rng.randint(0, 400)]),
+            "loan_balance": rng.choice([0, 0, 1, 999, 4500.75, 10000, rng.randint(0, 200000)]),
+        })
+    return employees
+
+def assert_batch_matches_scalar(employees: list, roles: dict):
+    batch = calculate_batch(employees, roles)
+    for i, emp in enumerate(employees):
+        expected, _ = calculate_for_employee_record(emp, roles)
+        got = batch_breakdown(batch, i)
+        assert got == expected, f"employee {emp.get('code')}: {got} != {expected}"
+
+def test_batch_matches_scalar():
+    data = load_data()
+    roles = data.get("roles", {})
+    assert_batch_matches_scalar(data.get("employees", []), roles)
+    assert_batch_matches_scalar(synthetic_employees(roles), roles)
+    assert_batch_matches_scalar([], roles)
+
+def main():
+    test_batch_matches_scalar()
+    print("calculate_batch matches calculate_for_employee_record for all employees")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# run_import_test.py
+# Check that bulk import rejects rows the pay calculation cannot handle
+# (nan / inf hours or loan balance) and still imports the good rows, and
+# that the upload route only accepts the CSV / JSONL formats.
+# Works on a temporary copy: never saves anything back to data/employees.json.
+
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from utils import data_handler
+from utils.bulk_io import iter_employee_rows, import_employees
+from utils.salary_calculator import calculate_batch
+
+CSV_ROWS = """name,username,password,role,exp,working_hours,loan_balance
+Good Row,import_good,secret,{role},2,160,0
+Nan Hours,import_nan,secret,{role},2,nan,0
+Inf Loan,import_inf,secret,{role},2,160,inf
+"""
+
+def test_import_rejects_non_finite_rows():
+    workdir = tempfile.mkdtemp(prefix="payroll-import-test-")
+    saved = (data_handler.DATA_PATH, data_handler.STORAGE_BACKEND)
+    try:
+        data_handler.DATA_PATH = os.path.join(workdir, "employees.json")
+        data_handler.STORAGE_BACKEND = "json"
+        shutil.copyfile(saved[0], data_handler.DATA_PATH)
+        data = data_handler.load_data()
+        role = next(iter(data["roles"]))
+
+        rows = iter_employee_rows(io.StringIO(CSV_ROWS.format(role=role)), "csv")
+        summary = import_employees(data, rows)
+
+        assert summary["imported"] == 1, summary
+        assert sorted(error["line"] for error in summary["errors"]) == [3, 4], summary
+        usernames = {emp["username"] for emp in data["employees"]}
+        assert "import_good" in usernames and not usernames & {"import_nan", "import_inf"}
+        calculate_batch(data["employees"], data["roles"])  # must not raise
+        with open(data_handler.DATA_PATH, "r", encoding="utf-8") as f:
+            assert len(json.load(f)["employees"]) == len(data["employees"])
+    finally:
+        data_handler.DATA_PATH, data_handler.STORAGE_BACKEND = saved
+        data_handler.invalidate_cache()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def test_import_route_rejects_unknown_formats():
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_role"] = "admin"
+    for filename, fmt in (("rows.csv", "../../evil"), ("rows.json", "")):
+        upload = (io.BytesIO(b"[]"), filename)
+        response = client.post("/admin/import", data={"file": upload, "format": fmt},
+                               content_type="multipart/form-data")
+        assert response.status_code == 400, (filename, fmt, response.get_json())
+
+def main():
+    test_import_rejects_non_finite_rows()
+    test_import_route_rejects_unknown_formats()
+    print("bulk import rejects nan / inf rows and unknown formats")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# run_payrun_test.py
+# Check the month-end pay run: a second run of the same month changes
+# nothing, every loan is debited exactly once, and the running year-to-date
+# totals match a recomputation from the issued records, including records
+# issued before the totals existed.
+# Works on a temporary copy: never saves anything back to data/employees.json.
+
+import json
+import os
+import shutil
+import tempfile
+
+from utils import data_handler
+from utils.payroll_records import issue_payroll_records
+from utils.payroll_reports import fiscal_year, check_ytd, update_ytd
+
+PERIOD = "2031-01"  # a month the sample data has not been paid for
+
+def test_payrun_runs_once():
+    workdir = tempfile.mkdtemp(prefix="payroll-payrun-test-")
+    saved = (data_handler.DATA_PATH, data_handler.STORAGE_BACKEND)
+    try:
+        data_handler.DATA_PATH = os.path.join(workdir, "employees.json")
+        data_handler.STORAGE_BACKEND = "json"
+        shutil.copyfile(saved[0], data_handler.DATA_PATH)
+        data = data_handler.load_data()
+        loans_before = {emp["code"]: emp.get("loan_balance", 0) for emp in data["employees"]}
+
+        first = issue_payroll_records(data, PERIOD)
+        assert not first["already_run"] and first["issued"] == len(loans_before), first
+        data_handler.invalidate_cache()
+        data = data_handler.load_data()
+        records = data["payroll_records"][PERIOD]
+        debited = {emp["code"]: emp.get("loan_balance", 0) for emp in data["employees"]}
+        for code, before in loans_before.items():
+            breakdown = records[str(code)]["breakdown"]
+            assert breakdown["loan_balance_after"] == debited[code]
+            assert abs(before - breakdown["loan_debit"] - debited[code]) < 0.01
+
+        second = issue_payroll_records(data, PERIOD)
+        assert second["already_run"] and second["issued"] == first["issued"], second
+        data_handler.invalidate_cache()
+        data = data_handler.load_data()
+        assert {emp["code"]: emp.get("loan_balance", 0) for emp in data["employees"]} == debited
+        with open(data_handler.DATA_PATH, "r", encoding="utf-8") as f:
+            assert [h["month"] for h in json.load(f)["payroll_history"]].count(PERIOD) == 1
+
+        assert check_ytd(data, fiscal_year(PERIOD)) == []
+    finally:
+        data_handler.DATA_PATH, data_handler.STORAGE_BACKEND = saved
+        data_handler.invalidate_cache()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _record(code, grosspay):
+    amounts = {"grosspay": grosspay, "pf": 0, "tax": 0, "loan_debit": 0, "netpay": grosspay}
+    return {"code": code, "department": "General", "breakdown": amounts}
+
+def test_update_ytd_folds_earlier_records():
+    # 2030-05 was partly issued before the totals existed, 2030-04 entirely
+    data = {"payroll_records": {"2030-04": {"1": _record(1, 100)}, "2030-05": {"1": _record(1, 200)}}}
+    new = _record(2, 300)
+    data["payroll_records"]["2030-05"]["2"] = new
+    ytd = update_ytd(data, "2030-05", [new])
+    assert ytd["periods"] == ["2030-04", "2030-05"]
+    assert ytd["employees"] == {"1": [2, 300, 0, 0, 0, 300], "2": [1, 300, 0, 0, 0, 300]}
+    assert check_ytd(data, "2030-31") == []
+    try:
+        fiscal_year("2030-13")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("month 13 accepted")
+
+def main():
+    test_payrun_runs_once()
+    test_update_ytd_folds_earlier_records()
+    print("pay run is idempotent, debits loans once and keeps YTD in step")
+
+if __name__ == "__main__":
+    main()
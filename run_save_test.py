@@ -0,0 +1,112 @@
+# run_save_test.py
+# Check the JSON save path: concurrent save_data() calls are written once,
+# a save after another writer's save raises StaleDataError and drops the
+# cached document, and a failed write leaves the file on disk untouched.
+# Works on a temporary copy: never saves anything back to data/employees.json.
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from utils import data_handler
+from utils.data_handler import load_data, save_data, StaleDataError
+
+@contextmanager
+def temp_data():
+    workdir = tempfile.mkdtemp(prefix="payroll-save-test-")
+    saved = (data_handler.DATA_PATH, data_handler.STORAGE_BACKEND)
+    try:
+        data_handler.DATA_PATH = os.path.join(workdir, "employees.json")
+        data_handler.STORAGE_BACKEND = "json"
+        shutil.copyfile(saved[0], data_handler.DATA_PATH)
+        data_handler.invalidate_cache()
+        yield workdir
+    finally:
+        data_handler.DATA_PATH, data_handler.STORAGE_BACKEND = saved
+        data_handler.invalidate_cache()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _version_on_disk() -> int:
+    with open(data_handler.DATA_PATH, "r", encoding="utf-8") as f:
+        return json.load(f).get("version", 0)
+
+def test_concurrent_saves_coalesce():
+    with temp_data():
+        data = load_data()
+        before = _version_on_disk()
+        writes = []
+        write_document, window = data_handler._write_document, data_handler.SAVE_COALESCE_WINDOW
+
+        def counting_write(doc):
+            writes.append(doc)
+            write_document(doc)
+
+        data_handler._write_document, data_handler.SAVE_COALESCE_WINDOW = counting_write, 0.2
+        try:
+            start = threading.Barrier(8)
+            errors = []
+
+            def saver():
+                start.wait()
+                try:
+                    save_data(data)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=saver) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            data_handler._write_document, data_handler.SAVE_COALESCE_WINDOW = write_document, window
+        assert errors == [] and len(writes) == 1, (errors, len(writes))
+        assert _version_on_disk() == before + 1
+
+def test_foreign_write_is_stale():
+    with temp_data():
+        data = load_data()
+        with open(data_handler.DATA_PATH, "r", encoding="utf-8") as f:
+            foreign = json.load(f)
+        foreign["version"] = foreign.get("version", 0) + 1
+        foreign["employees"][0]["name"] = "Saved Elsewhere"
+        with open(data_handler.DATA_PATH, "w", encoding="utf-8") as f:
+            json.dump(foreign, f)
+
+        try:
+            save_data(data)
+        except StaleDataError:
+            pass
+        else:
+            raise AssertionError("a save over another writer's version went through")
+        reloaded = load_data()
+        assert reloaded is not data and reloaded["employees"][0]["name"] == "Saved Elsewhere"
+
+def test_failed_write_keeps_file():
+    with temp_data() as workdir:
+        data = load_data()
+        with open(data_handler.DATA_PATH, "rb") as f:
+            before = f.read()
+        data["unserializable"] = object()
+        try:
+            save_data(data)
+        except TypeError:
+            pass
+        else:
+            raise AssertionError("an unserializable document was saved")
+        with open(data_handler.DATA_PATH, "rb") as f:
+            assert f.read() == before
+        assert [name for name in os.listdir(workdir) if name.endswith(".tmp")] == []
+        assert "unserializable" not in load_data()
+
+def main():
+    test_concurrent_saves_coalesce()
+    test_foreign_write_is_stale()
+    test_failed_write_keeps_file()
+    print("saves coalesce, stale saves are refused and failed writes leave the file intact")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# run_sqlite_test.py
+# Check that the SQLite backend round-trips the same edits as the JSON file:
+# add, edit, delete and add again, reload, and compare the employees (order
+# included) with the JSON backend.
+# Works on temporary copies: never saves anything back to data/employees.json.
+
+import json
+import os
+import shutil
+import tempfile
+
+from utils import data_handler
+from utils.data_handler import load_data, save_data, add_employee, update_employee, delete_employee
+from utils.records import json_default
+from utils.sqlite_backend import migrate_json
+
+def _edit(backend: str) -> list:
+    """Apply the same edits through `backend` and return the reloaded employees as JSON."""
+    data_handler.STORAGE_BACKEND = backend
+    data_handler.invalidate_cache()
+    data = load_data()
+    role = next(iter(data["roles"]))
+    first, second = data["employees"][0], data["employees"][1]
+
+    add_employee(data, {"code": 90001, "name": "Added First", "username": "added_first", "password": "x",
+                        "role": role, "exp": 1, "working_hours": 160, "loan_balance": 0, "department": "Ops"})
+    update_employee(data, {**first, "name": "Edited", "loan_balance": 1234})
+    save_data(data)
+    delete_employee(data, second["code"])
+    add_employee(data, {"code": 80002, "name": "Added Last", "username": "added_last", "password": "x",
+                        "role": role, "exp": 2, "working_hours": 150, "loan_balance": 10, "department": "Ops"})
+
+    data_handler.invalidate_cache()
+    return [json.loads(json.dumps(emp, default=json_default)) for emp in load_data()["employees"]]
+
+def test_sqlite_round_trip_matches_json():
+    workdir = tempfile.mkdtemp(prefix="payroll-sqlite-test-")
+    saved = (data_handler.DATA_PATH, data_handler.SQLITE_PATH, data_handler.STORAGE_BACKEND)
+    try:
+        data_handler.DATA_PATH = os.path.join(workdir, "employees.json")
+        data_handler.SQLITE_PATH = os.path.join(workdir, "payroll.db")
+        shutil.copyfile(saved[0], data_handler.DATA_PATH)
+        migrate_json(data_handler.DATA_PATH, data_handler.SQLITE_PATH)
+
+        from_sqlite = _edit("sqlite")
+        from_json = _edit("json")
+        assert [e["code"] for e in from_sqlite] == [e["code"] for e in from_json]
+        assert from_sqlite[-1]["code"] == 80002 and from_sqlite[0]["name"] == "Edited"
+        assert from_sqlite == from_json
+    finally:
+        data_handler.DATA_PATH, data_handler.SQLITE_PATH, data_handler.STORAGE_BACKEND = saved
+        data_handler.invalidate_cache()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    test_sqlite_round_trip_matches_json()
+    print("SQLite round trip matches the JSON backend")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,32 @@
 # run_test.py
 # Quick script to test loading JSON, calculating pay for one employee,
 # updating and saving back to the JSON store.
+# Works on a temporary copy: never saves anything back to data/employees.json.
 
+import os
+import shutil
+import tempfile
+
+from utils import data_handler
 from utils.data_handler import load_data, save_data, find_employee_by_code, update_employee
 from utils.salary_calculator import calculate_for_employee_record
 import pprint
 
 def main():
+    workdir = tempfile.mkdtemp(prefix="payroll-run-test-")
+    saved = (data_handler.DATA_PATH, data_handler.STORAGE_BACKEND)
+    try:
+        data_handler.DATA_PATH = os.path.join(workdir, "employees.json")
+        data_handler.STORAGE_BACKEND = "json"
+        shutil.copyfile(saved[0], data_handler.DATA_PATH)
+        data_handler.invalidate_cache()
+        run()
+    finally:
+        data_handler.DATA_PATH, data_handler.STORAGE_BACKEND = saved
+        data_handler.invalidate_cache()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def run():
     data = load_data()
     # pick an existing employee code from your employees.json
     emp_code = 101
@@ -23,7 +43,7 @@ def main():
 
     update_employee(data, updated_emp)
     save_data(data)
-    print("\nEmployee updated and saved back to data/employees.json")
+    print("\nEmployee updated and saved back to", data_handler.DATA_PATH)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,97 @@
+# startup_report.py
+# Import-time report for `import app` (what every worker pays when it boots),
+# from `python -X importtime` in a fresh interpreter.
+#
+#   python startup_report.py                      # top modules, total
+#   python startup_report.py --json               # machine-readable
+#   python startup_report.py --budget-ms 300      # exit 1 when over budget
+#
+# Also fails when a library that app.py loads lazily (see utils/warmup.py)
+# is imported at startup again.
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = 300
+DEFAULT_TOP = 20
+LAZY_PACKAGES = ("matplotlib", "reportlab", "numpy")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$")
+
+def measure(target: str = "app") -> list:
+    """[(module, self_us, cumulative_us, depth)] for `import target` in a fresh interpreter."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{proc.stderr}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+def summarize(rows: list, target: str = "app", top: int = DEFAULT_TOP) -> dict:
+    """Total, per-top-level-package totals and the slowest modules."""
+    total_us = next((cum for module, _, cum, depth in rows if module == target and depth == 0), 0)
+    packages = {}
+    for module, self_us, _, _ in rows:
+        root = module.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+    slowest = sorted(rows, key=lambda r: r[2], reverse=True)[:top]
+    imported = {module.split(".")[0] for module, _, _, _ in rows}
+    return {
+        "target": target,
+        "total_ms": round(total_us / 1000, 1),
+        "modules": len(rows),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in
+                        sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:top]},
+        "slowest": [{"module": module, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cum / 1000, 1)}
+                    for module, self_us, cum, _ in slowest],
+        "eager_heavy_imports": [name for name in LAZY_PACKAGES if name in imported],
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time report for the Flask app")
+    parser.add_argument("--target", default="app", help="module to import (default: %(default)s)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="fail when the import takes longer (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="modules / packages to list")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = summarize(measure(args.target), args.target, args.top)
+    report["budget_ms"] = args.budget_ms
+    report["over_budget"] = report["total_ms"] > args.budget_ms
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.target}: {report['total_ms']} ms across {report['modules']} modules "
+              f"(budget {args.budget_ms:g} ms)")
+        print(f"\n{'package':<32}{'self ms':>10}")
+        for name, ms in report["packages_ms"].items():
+            print(f"{name:<32}{ms:>10}")
+        print(f"\n{'module':<48}{'self ms':>10}{'cum ms':>10}")
+        for row in report["slowest"]:
+            print(f"{row['module']:<48}{row['self_ms']:>10}{row['cumulative_ms']:>10}")
+
+    failed = False
+    if report["over_budget"]:
+        print(f"OVER BUDGET: {report['total_ms']} ms > {args.budget_ms:g} ms", file=sys.stderr)
+        failed = True
+    if report["eager_heavy_imports"]:
+        print(f"EAGER IMPORT: {', '.join(report['eager_heavy_imports'])} loaded at startup", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+# utils/asgi_bridge.py
+"""
+ASGI serving mode for the (synchronous) Flask app.
+- WsgiToAsgi(app): an ASGI application that keeps every connection on the
+  event loop and runs each request's WSGI call on a bounded thread pool,
+  so slow clients and idle keep-alives cost no thread
+- two pools: "render" for payslip PDFs, charts, exports and job results
+  (ReportLab / matplotlib / large files), "web" for everything else, so a
+  burst of downloads cannot starve the dashboards
+- backpressure: each pool admits at most `threads + queue` requests; the
+  next one gets an immediate 503 with Retry-After instead of waiting
+- lifespan: optional prewarm on startup (PAYROLL_PREWARM=1), pools shut
+  down on exit; websocket connections are closed, other scopes ignored
+
+Request bodies are read on the event loop into a spooled temp file before
+a thread is taken; streamed responses (bulk progress, exports) are sent
+chunk by chunk from the worker thread.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.instrumentation import register_gauges
+from utils.render_pool import shutdown_render_pool
+
+WEB_THREADS = int(os.environ.get("PAYROLL_ASGI_WEB_THREADS", "16"))
+WEB_QUEUE = int(os.environ.get("PAYROLL_ASGI_WEB_QUEUE", "256"))
+RENDER_THREADS = int(os.environ.get("PAYROLL_ASGI_RENDER_THREADS", str(os.cpu_count() or 2)))
+RENDER_QUEUE = int(os.environ.get("PAYROLL_ASGI_RENDER_QUEUE", "32"))
+BODY_SPOOL_BYTES = 1024 * 1024  # larger uploads go to a temp file
+RETRY_AFTER_SECONDS = 1
+
+RENDER_ROUTES = re.compile(r"^/(payslip/\d+/pdf|charts/|admin/export/|admin/payslips/bulk|jobs/[^/]+/result)")
+
+def classify(path: str) -> str:
+    return "render" if RENDER_ROUTES.match(path) else "web"
+
+class BoundedPool:
+    """A thread pool that admits at most threads + queue calls at a time."""
+
+    def __init__(self, name: str, threads: int, queue: int):
+        self.name = name
+        self.threads = threads
+        self.limit = threads + queue
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"asgi-{name}")
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        # only called from the event loop thread, the lock is for the stats reader
+        with self._lock:
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"threads": self.threads, "limit": self.limit, "in_flight": self.in_flight,
+                    "rejected": self.rejected}
+
+def _environ(scope: dict, body, body_length: int) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1] if server[1] is not None else 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        "asgi.scope": scope,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+            key = name
+        else:
+            key = f"HTTP_{name}"
+        if key in environ:
+            value = environ[key] + ("; " if key == "HTTP_COOKIE" else ",") + value
+        environ[key] = value
+    # the body is fully buffered, so its length is known even for chunked uploads
+    environ["CONTENT_LENGTH"] = str(body_length)
+    return environ
+
+class WsgiToAsgi:
+    def __init__(self, wsgi_app, web_threads: int = WEB_THREADS, web_queue: int = WEB_QUEUE,
+                 render_threads: int = RENDER_THREADS, render_queue: int = RENDER_QUEUE):
+        self.wsgi_app = wsgi_app
+        self.pools = {
+            "web": BoundedPool("web", web_threads, web_queue),
+            "render": BoundedPool("render", render_threads, render_queue),
+        }
+        register_gauges("payroll_asgi", self.stats)
+
+    def stats(self) -> dict:
+        gauges = {}
+        for name, pool in self.pools.items():
+            gauges.update({f"{name}_{key}": value for key, value in pool.stats().items()})
+        return gauges
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await send({"type": "websocket.close"})  # no websocket routes: rejected before accept (403)
+        # any other scope type: nothing to serve, and raising would only log an error per connection
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                from utils.warmup import PREWARM_ENABLED, prewarm
+                try:
+                    if PREWARM_ENABLED:
+                        await asyncio.get_running_loop().run_in_executor(self.pools["render"].executor, prewarm)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": f"{type(e).__name__}: {e}"})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for pool in self.pools.values():
+                    pool.executor.shutdown(wait=True)
+                shutdown_render_pool()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_SPOOL_BYTES)
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                return None
+            body.write(message.get("body", b""))
+            if not message.get("more_body", False):
+                body.seek(0)
+                return body
+
+    async def _http(self, scope, receive, send):
+        body = await self._read_body(receive)
+        if body is None:
+            return  # client went away before the request was complete
+        body.seek(0, os.SEEK_END)
+        body_length = body.tell()
+        body.seek(0)
+        pool = self.pools[classify(scope["path"])]
+        try:
+            if not pool.try_acquire():
+                await send({"type": "http.response.start", "status": 503, "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"retry-after", str(RETRY_AFTER_SECONDS).encode("ascii")),
+                ]})
+                await send({"type": "http.response.body", "body": b"Server busy, please retry.\n"})
+                return
+            try:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(pool.executor, self._run_wsgi,
+                                           _environ(scope, body, body_length), loop, send)
+            finally:
+                pool.release()
+        finally:
+            body.close()
+
+    def _run_wsgi(self, environ: dict, loop, send):
+        """Worker thread: call the WSGI app and forward status, headers and body chunks to the loop."""
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response = {}
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                                   for name, value in headers]
+            return write
+
+        def begin():
+            if not started:
+                send_sync({"type": "http.response.start", "status": response["status"],
+                           "headers": response["headers"]})
+                started.append(True)
+
+        def write(chunk: bytes):
+            begin()
+            send_sync({"type": "http.response.body", "body": chunk, "more_body": True})
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    write(chunk)
+            begin()
+            send_sync({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            if hasattr(result, "close"):
+                result.close()
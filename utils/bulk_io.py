@@ -0,0 +1,182 @@
+# utils/bulk_io.py
+"""
+Streaming bulk import / export of employees (CSV or JSON Lines).
+- iter_employee_rows(stream, fmt): generator of (line_no, raw row)
+- validate_employee_row(row, roles): typed employee dict or an error
+- import_employees(data, rows): batched insert, one save_data per batch;
+  each batch's passwords are hashed in parallel before it is inserted
+- iter_export(data, fmt): yields CSV / JSONL text chunk by chunk, with each
+  employee's computed breakdown (calculate_batch per chunk)
+Nothing here holds the whole input or output file in memory.
+"""
+
+import csv
+import io
+import json
+import math
+
+from utils.data_handler import update_employee, save_data
+from utils.employee_store import store_for
+from utils.passwords import hash_passwords, is_hashed
+from utils.salary_calculator import calculate_batch, BATCH_COLUMNS
+
+IMPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+EMPLOYEE_FIELDS = ("code", "name", "username", "password", "role", "exp", "working_hours", "loan_balance", "department")
+EXPORT_FIELDS = ("code", "name", "username", "role", "department", "exp", "working_hours", "loan_balance")
+BREAKDOWN_FIELDS = tuple(c for c in BATCH_COLUMNS if c not in ("hours",))
+
+FORMATS = ("csv", "jsonl")
+
+def format_for_filename(filename: str) -> str:
+    """"jsonl" for .jsonl / .ndjson, else "csv"; ValueError for .json (an array cannot be streamed)."""
+    name = filename.lower()
+    if name.endswith(".json"):
+        raise ValueError("a .json file is not JSON Lines: use .jsonl (one object per line) or .csv")
+    return "jsonl" if name.endswith((".jsonl", ".ndjson")) else "csv"
+
+# ---------------------- IMPORT ----------------------
+def iter_employee_rows(stream, fmt: str = "csv"):
+    """Yield (line_no, row dict) from a text stream, one row at a time."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, {"__error__": f"invalid JSON: {e}"}
+                continue
+            yield line_no, row if isinstance(row, dict) else {"__error__": "expected a JSON object"}
+    else:
+        raise ValueError(f"unknown format {fmt!r}")
+
+def validate_employee_row(row: dict, roles: dict):
+    """Return (employee, None) for a valid row or (None, error message)."""
+    if "__error__" in row:
+        return None, row["__error__"]
+    for field in ("name", "username", "password", "role"):
+        if not str(row.get(field) or "").strip():
+            return None, f"missing {field}"
+    if row["role"] not in roles:
+        return None, f"unknown role {row['role']!r}"
+
+    emp = {
+        "name": str(row["name"]).strip(),
+        "username": str(row["username"]).strip(),
+        "password": str(row["password"]),
+        "role": row["role"],
+        "department": str(row.get("department") or "General").strip(),
+    }
+    try:
+        if str(row.get("code") or "").strip():
+            emp["code"] = int(row["code"])
+        emp["exp"] = int(row.get("exp") or 0)
+        emp["working_hours"] = float(row.get("working_hours") or roles[row["role"]].get("default_hours", 0))
+        emp["loan_balance"] = float(row.get("loan_balance") or 0)
+    except (TypeError, ValueError):
+        return None, "exp, working_hours, loan_balance and code must be numeric"
+    if not (math.isfinite(emp["working_hours"]) and math.isfinite(emp["loan_balance"])):
+        return None, "working_hours and loan_balance must be finite numbers"
+    if emp["exp"] < 0 or emp["working_hours"] < 0 or emp["loan_balance"] < 0:
+        return None, "exp, working_hours and loan_balance must not be negative"
+    return emp, None
+
+def import_employees(data: dict, rows, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Validate and insert rows from iter_employee_rows(). Employees without a
+    code get the next free one. Saves once per batch of batch_size rows.
+    """
+    roles = data.get("roles", {})
+    store = store_for(data)
+    next_code = max((code for code, _ in store.items()), default=1000) + 1
+    summary = {"imported": 0, "rejected": 0, "batches": 0, "errors": []}
+
+    def reject(line_no, message):
+        summary["rejected"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"line": line_no, "error": message})
+
+    pending = []
+    batch_codes, batch_usernames = set(), set()
+
+    def flush():
+        plain = [emp for emp in pending if not is_hashed(emp["password"])]  # pre-hashed values are kept as they are
+        for emp, hashed in zip(plain, hash_passwords([emp["password"] for emp in plain])):
+            emp["password"] = hashed
+        for emp in pending:
+            update_employee(data, emp)
+        save_data(data)
+        summary["batches"] += 1
+        pending.clear()
+        batch_codes.clear()
+        batch_usernames.clear()
+
+    for line_no, row in rows:
+        emp, error = validate_employee_row(row, roles)
+        if error is None and "code" in emp and (emp["code"] in batch_codes or store.get(emp["code"]) is not None):
+            error = f"code {emp['code']} already exists"
+        if error is None and (emp["username"] in batch_usernames or store.get_by_username(emp["username"]) is not None):
+            error = f"username {emp['username']!r} already exists"
+        if error is not None:
+            reject(line_no, error)
+            continue
+
+        if "code" not in emp:
+            while next_code in batch_codes or store.get(next_code) is not None:
+                next_code += 1
+            emp = {"code": next_code, **emp}
+        batch_codes.add(emp["code"])
+        batch_usernames.add(emp["username"])
+        pending.append(emp)
+        summary["imported"] += 1
+        if len(pending) >= batch_size:
+            flush()
+
+    if pending:
+        flush()
+    return summary
+
+# ---------------------- EXPORT ----------------------
+def _export_rows(data: dict):
+    """Yield (employee, breakdown) pairs, computing breakdowns one chunk at a time."""
+    employees = data.get("employees", [])
+    roles = data.get("roles", {})
+    for start in range(0, len(employees), EXPORT_CHUNK_SIZE):
+        chunk = employees[start:start + EXPORT_CHUNK_SIZE]
+        batch = calculate_batch(chunk, roles)
+        columns = {key: batch[key].tolist() for key in BREAKDOWN_FIELDS}
+        for i, emp in enumerate(chunk):
+            yield emp, {key: columns[key][i] for key in BREAKDOWN_FIELDS}
+
+def iter_export(data: dict, fmt: str = "csv"):
+    """Yield the export as text chunks (one per EXPORT_CHUNK_SIZE employees)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(EXPORT_FIELDS + BREAKDOWN_FIELDS)
+
+    count = 0
+    for emp, breakdown in _export_rows(data):
+        if fmt == "csv":
+            writer.writerow([emp.get(f) for f in EXPORT_FIELDS] + [breakdown[f] for f in BREAKDOWN_FIELDS])
+        else:
+            record = {f: emp.get(f) for f in EXPORT_FIELDS}
+            record["breakdown"] = breakdown
+            buffer.write(json.dumps(record) + "\n")
+        count += 1
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,132 @@
+# utils/bulk_payslips.py
+"""
+Month-end payslip PDFs for the whole workforce.
+- generate_bulk_payslips(data, period): shards employees across a
+  ProcessPoolExecutor (one worker per CPU, forkserver) and yields progress events
+- resumable: each PDF is written to a temp name and renamed when complete,
+  then its payslip_cache.payslip_key is written next to it; a rerun skips
+  only the payslips whose key still matches (same employee, breakdown,
+  period and template)
+- optional ZIP of the whole period, plus per-worker throughput (PDFs/sec)
+"""
+
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.payroll_records import payroll_breakdown, current_period, parse_period
+from utils.payslip_cache import payslip_key
+from utils.pdf_generator import generate_payslip_pdf
+
+# outside static/: every employee's payslip, served only through the admin's job result
+BULK_FOLDER = os.path.join("data", "payslips", "bulk")
+
+def payslip_filename(emp: dict, period: str) -> str:
+    return f"Payslip_{emp['code']}_{period}.pdf"
+
+def _key_path(folder: str, filename: str) -> str:
+    """Sidecar holding the payslip_key the PDF was rendered from."""
+    return os.path.join(folder, f".{filename}.key")
+
+def _is_current(folder: str, filename: str, key: str) -> bool:
+    try:
+        with open(_key_path(folder, filename), "r", encoding="ascii") as f:
+            return f.read() == key and os.path.exists(os.path.join(folder, filename))
+    except FileNotFoundError:
+        return False
+
+def _render_shard(shard: list, folder: str, period: str) -> dict:
+    """Worker: render one shard of (employee, breakdown, filename) jobs."""
+    started = time.perf_counter()
+    rendered = skipped = 0
+    for emp, breakdown, filename in shard:
+        key = payslip_key(emp, breakdown, period)
+        if _is_current(folder, filename, key):
+            skipped += 1
+            continue
+        tmp_name = f".{filename}.{os.getpid()}.tmp"
+        tmp_path = generate_payslip_pdf(emp, breakdown, output_folder=folder, filename=tmp_name)
+        os.replace(tmp_path, os.path.join(folder, filename))
+        # written last: a PDF without a matching key is rendered again on resume
+        key_tmp = f"{_key_path(folder, filename)}.{os.getpid()}.tmp"
+        with open(key_tmp, "w", encoding="ascii") as f:
+            f.write(key)
+        os.replace(key_tmp, _key_path(folder, filename))
+        rendered += 1
+    return {
+        "pid": os.getpid(),
+        "rendered": rendered,
+        "skipped": skipped,
+        "seconds": time.perf_counter() - started,
+    }
+
+def _write_zip(folder: str, filenames: list, zip_path: str):
+    tmp_path = zip_path + ".tmp"
+    # PDFs are already compressed; store them as-is
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as zf:
+        for filename in filenames:
+            zf.write(os.path.join(folder, filename), arcname=filename)
+    os.replace(tmp_path, zip_path)
+
+def generate_bulk_payslips(data: dict, period: str = None, output_folder: str = BULK_FOLDER,
+                           workers: int = None, shard_size: int = 100, zip_path: str = None):
+    """
+    Render a payslip for every employee of `period` (YYYY-MM, ValueError
+    otherwise) into output_folder/period.
+    Yields a progress dict after each finished shard; the last one has
+    "finished": True plus per-worker and overall PDFs/sec.
+    """
+    period = parse_period(period or current_period())  # also the folder name: no "../" in it
+    folder = os.path.join(output_folder, period)
+    os.makedirs(folder, exist_ok=True)
+    # leftovers of an interrupted run
+    for name in os.listdir(folder):
+        if name.endswith(".tmp"):
+            os.unlink(os.path.join(folder, name))
+
+    jobs = [(emp, payroll_breakdown(data, emp, period), payslip_filename(emp, period))
+            for emp in data.get("employees", [])]
+    shards = [jobs[i:i + shard_size] for i in range(0, len(jobs), shard_size)]
+    workers = workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    done = rendered = skipped = 0
+    per_worker = {}
+    # forkserver (spawn where unavailable): this may run in a job worker thread of the
+    # web process, and a forked child could inherit a lock held by another thread
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {pool.submit(_render_shard, shard, folder, period): len(shard) for shard in shards}
+        for future in as_completed(futures):
+            result = future.result()
+            done += futures[future]
+            rendered += result["rendered"]
+            skipped += result["skipped"]
+            stats = per_worker.setdefault(result["pid"], {"rendered": 0, "seconds": 0.0})
+            stats["rendered"] += result["rendered"]
+            stats["seconds"] += result["seconds"]
+            yield {"finished": False, "done": done, "total": len(jobs),
+                   "elapsed": round(time.perf_counter() - started, 2)}
+
+    if zip_path:
+        _write_zip(folder, [filename for _, _, filename in jobs], zip_path)
+
+    elapsed = time.perf_counter() - started
+    yield {
+        "finished": True,
+        "period": period,
+        "folder": folder,
+        "zip_path": zip_path,
+        "total": len(jobs),
+        "rendered": rendered,
+        "skipped": skipped,
+        "elapsed": round(elapsed, 2),
+        "pdfs_per_sec": round(rendered / elapsed, 2) if elapsed else 0.0,
+        "workers": {
+            pid: round(s["rendered"] / s["seconds"], 2) if s["seconds"] else 0.0
+            for pid, s in per_worker.items()
+        },
+    }
@@ -5,99 +5,166 @@ Creates:
 1. Salary Distribution per Role (Bar)
 2. Average Deductions Breakdown (Pie)
 3. Company Payroll Expense Over Time (Line)
+
+Charts are drawn on standalone Agg Figure objects (no pyplot global state,
+safe to call from several threads) from the precomputed dashboard
+aggregates, and the PNG/SVG bytes are cached by a fingerprint of the data.
+Chart files are named by that fingerprint; writing a new one removes the
+chart's older files.
 """
 
+import hashlib
+import io
+import json
 import os
-import matplotlib.pyplot as plt
-from collections import defaultdict
-from utils.salary_calculator import calculate_for_employee_record
+import re
+import threading
+from collections import OrderedDict
+
+from utils.instrumentation import span
+from utils.payroll_aggregates import aggregates_for
+
+CHART_NAMES = ("salary_distribution", "deductions_pie", "payroll_trend")
+CHART_FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+CHART_CACHE_SIZE = 32
+
+_chart_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
 
-def ensure_folder(folder="static/charts"):
+CHART_FOLDER = os.path.join("static", "charts")
+
+def ensure_folder(folder=CHART_FOLDER):
     if not os.path.exists(folder):
         os.makedirs(folder, exist_ok=True)
     return folder
 
-def salary_distribution_chart(data):
+def _new_figure(figsize):
+    # matplotlib is loaded on the first chart render, not when the app starts
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def _draw_salary_distribution(charts_data):
     """Bar chart of total salary per role."""
-    folder = ensure_folder()
-    roles = data.get("roles", {})
-    employees = data.get("employees", [])
-    role_totals = defaultdict(float)
-
-    for emp in employees:
-        breakdown, _ = calculate_for_employee_record(emp, roles)
-        role_totals[emp["role"]] += breakdown["grosspay"]
-
-    roles_list = list(role_totals.keys())
-    totals = [role_totals[r] for r in roles_list]
-
-    plt.figure(figsize=(8, 5))
-    plt.bar(roles_list, totals)
-    plt.title("Salary Distribution per Role")
-    plt.ylabel("Total Gross Pay (₹)")
-    plt.xticks(rotation=25)
-    plt.tight_layout()
-    path = os.path.join(folder, "salary_distribution.png")
-    plt.savefig(path)
-    plt.close()
-    return path
+    fig = _new_figure((8, 5))
+    ax = fig.add_subplot()
+    ax.bar(charts_data["roles"], charts_data["roleTotals"])
+    ax.set_title("Salary Distribution per Role")
+    ax.set_ylabel("Total Gross Pay (₹)")
+    ax.tick_params(axis="x", labelrotation=25)
+    return fig
 
-def deductions_pie_chart(data):
+def _draw_deductions_pie(charts_data):
     """Pie chart of average deduction breakdown."""
-    folder = ensure_folder()
-    employees = data.get("employees", [])
-    roles = data.get("roles", {})
-
-    total_pf = total_tax = total_loan = count = 0
-    for emp in employees:
-        breakdown, _ = calculate_for_employee_record(emp, roles)
-        total_pf += breakdown["pf"]
-        total_tax += breakdown["tax"]
-        total_loan += breakdown["loan_debit"]
-        count += 1
-
-    avg_pf = total_pf / count
-    avg_tax = total_tax / count
-    avg_loan = total_loan / count
-
+    fig = _new_figure((5, 5))
+    ax = fig.add_subplot()
     labels = ["PF (12%)", "Tax (4%)", "Loan Debit (9%)"]
-    values = [avg_pf, avg_tax, avg_loan]
-
-    plt.figure(figsize=(5, 5))
-    plt.pie(values, labels=labels, autopct="%1.1f%%", startangle=90)
-    plt.title("Average Deductions Breakdown")
-    plt.tight_layout()
-    path = os.path.join(folder, "deductions_pie.png")
-    plt.savefig(path)
-    plt.close()
+    values = [charts_data["avgPF"], charts_data["avgTax"], charts_data["avgLoan"]]
+    if sum(values) > 0:
+        ax.pie(values, labels=labels, autopct="%1.1f%%", startangle=90)
+    else:
+        ax.text(0.5, 0.5, "No deductions", ha="center", va="center")
+        ax.set_axis_off()
+    ax.set_title("Average Deductions Breakdown")
+    return fig
+
+def _draw_payroll_trend(charts_data):
+    """Line chart showing company payroll expense over time."""
+    fig = _new_figure((8, 4))
+    ax = fig.add_subplot()
+    ax.plot(charts_data["months"], charts_data["expenses"], marker="o", linewidth=2)
+    ax.set_title("Company Payroll Expense Over Time")
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Total Expense (₹)")
+    ax.grid(True, linestyle="--", alpha=0.6)
+    return fig
+
+_DRAWERS = {
+    "salary_distribution": _draw_salary_distribution,
+    "deductions_pie": _draw_deductions_pie,
+    "payroll_trend": _draw_payroll_trend,
+}
+
+# The aggregate fields each chart depends on
+_CHART_INPUTS = {
+    "salary_distribution": ("roles", "roleTotals"),
+    "deductions_pie": ("avgPF", "avgTax", "avgLoan"),
+    "payroll_trend": ("months", "expenses"),
+}
+
+def chart_fingerprint(name: str, charts_data: dict, fmt: str = "png") -> str:
+    inputs = [charts_data[key] for key in _CHART_INPUTS[name]]
+    raw = json.dumps([name, fmt, inputs], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:20]
+
+def render_chart(name: str, charts_data: dict, fmt: str = "png") -> bytes:
+    """Chart image bytes for the dashboard aggregates, served from cache when the data is unchanged."""
+    if name not in _DRAWERS or fmt not in CHART_FORMATS:
+        raise ValueError(f"unknown chart {name!r} / format {fmt!r}")
+    key = chart_fingerprint(name, charts_data, fmt)
+    with _chart_cache_lock:
+        if key in _chart_cache:
+            _chart_cache.move_to_end(key)
+            return _chart_cache[key]
+
+    with span("render_chart"):
+        fig = _DRAWERS[name](charts_data)
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt)
+        image = buffer.getvalue()
+
+    with _chart_cache_lock:
+        _chart_cache[key] = image
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+    return image
+
+def _write_chart(name: str, charts_data: dict, folder: str) -> str:
+    """Write the chart under a fingerprinted name (atomic rename, no shared fixed path)."""
+    path = os.path.join(folder, f"{name}_{chart_fingerprint(name, charts_data)}.png")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(render_chart(name, charts_data))
+        os.replace(tmp_path, path)
+        _remove_old_charts(name, folder, keep=os.path.basename(path))
     return path
 
+def _remove_old_charts(name: str, folder: str, keep: str):
+    """Delete this chart's files for earlier fingerprints, so the folder holds one per chart."""
+    pattern = re.compile(rf"{re.escape(name)}_[0-9a-f]{{20}}\.png")
+    for filename in os.listdir(folder):
+        if filename != keep and pattern.fullmatch(filename):
+            try:
+                os.unlink(os.path.join(folder, filename))
+            except FileNotFoundError:
+                pass  # another worker removed it first
+
+def salary_distribution_chart(data):
+    """Bar chart of total salary per role."""
+    return _write_chart("salary_distribution", aggregates_for(data).charts_data(), ensure_folder())
+
+def deductions_pie_chart(data):
+    """Pie chart of average deduction breakdown."""
+    return _write_chart("deductions_pie", aggregates_for(data).charts_data(), ensure_folder())
+
 def payroll_trend_chart(data):
     """Line chart showing company payroll expense over time."""
-    folder = ensure_folder()
-    history = sorted(data.get("payroll_history", []), key=lambda x: x["month"])
-    if not history:
+    charts_data = aggregates_for(data).charts_data()
+    if not charts_data["months"]:
         return None
+    return _write_chart("payroll_trend", charts_data, ensure_folder())
 
-    months = [h["month"] for h in history]
-    expenses = [h["total_expense"] for h in history]
-
-    plt.figure(figsize=(8, 4))
-    plt.plot(months, expenses, marker="o", linewidth=2)
-    plt.title("Company Payroll Expense Over Time")
-    plt.xlabel("Month")
-    plt.ylabel("Total Expense (₹)")
-    plt.grid(True, linestyle="--", alpha=0.6)
-    plt.tight_layout()
-    path = os.path.join(folder, "payroll_trend.png")
-    plt.savefig(path)
-    plt.close()
-    return path
-
-def generate_all_charts(data):
-    """Generate all charts and return their file paths."""
+def generate_all_charts(data, folder: str = CHART_FOLDER):
+    """Generate all charts into folder and return their file paths."""
+    charts_data = aggregates_for(data).charts_data()
+    folder = ensure_folder(folder)
     return {
-        "salary_distribution": salary_distribution_chart(data),
-        "deductions_pie": deductions_pie_chart(data),
-        "payroll_trend": payroll_trend_chart(data)
+        "salary_distribution": _write_chart("salary_distribution", charts_data, folder),
+        "deductions_pie": _write_chart("deductions_pie", charts_data, folder),
+        "payroll_trend": _write_chart("payroll_trend", charts_data, folder) if charts_data["months"] else None,
     }
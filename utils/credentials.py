@@ -0,0 +1,159 @@
+# utils/credentials.py
+"""
+Login credentials.
+- lookup_credentials(username): matching admin / employee credentials from
+  the admin logins plus the store's username index (JSON storage) or one
+  indexed query (SQLite); with SQLite, no full document load
+- verify_login(username, password): the slow hash check, run on a small
+  bounded thread pool so a burst of logins cannot occupy every request
+  thread; raises LoginBusy when too many checks are already queued
+- plaintext / weaker passwords are re-hashed after login by one background
+  thread with a bounded queue, each batch of upgrades in a single save
+- migrate_plaintext_passwords(data): hash every plaintext password, one save
+"""
+
+import os
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import data_handler
+from utils.data_handler import load_data, save_data, update_employee, employees_changed, document_lock
+from utils.employee_store import store_for
+from utils.passwords import hash_password, hash_passwords, verify_password, is_hashed, needs_rehash
+
+LOGIN_VERIFY_WORKERS = int(os.environ.get("PAYROLL_LOGIN_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+LOGIN_QUEUE_LIMIT = int(os.environ.get("PAYROLL_LOGIN_QUEUE", "32"))
+UPGRADE_QUEUE_LIMIT = int(os.environ.get("PAYROLL_UPGRADE_QUEUE", "256"))
+UPGRADE_BATCH_SIZE = 64
+
+class LoginBusy(Exception):
+    """More logins are waiting for verification than LOGIN_QUEUE_LIMIT."""
+
+# ---------------------- LOOKUP ----------------------
+def lookup_credentials(username: str) -> list:
+    """Credentials for username: admin logins first, then the employee (first record wins)."""
+    if data_handler.STORAGE_BACKEND == "sqlite":
+        return data_handler._sqlite().fetch_credentials(username)
+    data = load_data()
+    credentials = [{"kind": "admin", "name": name, "username": username, "password": login.get("password")}
+                   for name, login in data.get("logins", {}).items() if login.get("username") == username]
+    emp = store_for(data).get_by_username(username)
+    if emp is not None:
+        credentials.append({"kind": "employee", "code": emp.get("code"), "username": username,
+                            "password": emp.get("password")})
+    return credentials
+
+# ---------------------- VERIFICATION POOL ----------------------
+_pool = ThreadPoolExecutor(max_workers=LOGIN_VERIFY_WORKERS, thread_name_prefix="login-verify")
+_queue_slots = threading.BoundedSemaphore(LOGIN_QUEUE_LIMIT)
+_dummy_hash = None
+
+def _check(candidates: list, password: str):
+    global _dummy_hash
+    if not candidates:
+        # same cost as a real check, so response time does not reveal unknown usernames
+        if _dummy_hash is None:
+            _dummy_hash = hash_password("unused")
+        verify_password(password, _dummy_hash)
+        return None
+    for credential in candidates:
+        if verify_password(password, credential["password"]):
+            return credential
+    return None
+
+def verify_login(username: str, password: str):
+    """Return the matching credential dict, or None. Blocks the caller until the pool has checked it."""
+    if not _queue_slots.acquire(blocking=False):
+        raise LoginBusy()
+    try:
+        future = _pool.submit(_check, lookup_credentials(username), password)
+    except BaseException:
+        _queue_slots.release()
+        raise
+    future.add_done_callback(lambda _: _queue_slots.release())
+    credential = future.result()
+    if credential is not None and needs_rehash(credential["password"]):
+        _upgrader.submit(credential, password)
+    return credential
+
+# ---------------------- REHASH AFTER LOGIN ----------------------
+def upgrade_passwords(upgrades: list) -> int:
+    """
+    Replace the plaintext / weaker stored password of each (credential,
+    password) pair, skipping entries changed since the login; one save.
+    Returns the number of passwords replaced.
+    """
+    data = load_data()
+    hashes = hash_passwords([password for _, password in upgrades])
+    store = store_for(data)
+    replaced = 0
+    with document_lock:
+        for (credential, _), hashed in zip(upgrades, hashes):
+            if credential["kind"] == "admin":
+                entry = data.get("logins", {}).get(credential["name"])
+                if entry is None or entry.get("password") != credential["password"]:
+                    continue
+                entry["password"] = hashed
+            else:
+                emp = store.get(credential["code"])
+                if emp is None or emp.get("password") != credential["password"]:
+                    continue
+                update_employee(data, {**emp, "password": hashed})
+            replaced += 1
+    if replaced:
+        save_data(data)
+    return replaced
+
+class _Upgrader:
+    """One background thread draining a bounded queue of re-hashes, a batch per save."""
+
+    def __init__(self, limit: int):
+        self._queue = queue.Queue(maxsize=limit)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, credential: dict, password: str):
+        try:
+            self._queue.put_nowait((credential, password))
+        except queue.Full:
+            return  # best effort: the user's next login queues it again
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():  # also after a fork
+                self._thread = threading.Thread(target=self._run, name="password-upgrade", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < UPGRADE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                upgrade_passwords(batch)
+            except Exception:
+                traceback.print_exc()  # e.g. StaleDataError: the next login retries
+
+
+_upgrader = _Upgrader(UPGRADE_QUEUE_LIMIT)
+
+# ---------------------- MIGRATION ----------------------
+def migrate_plaintext_passwords(data: dict) -> dict:
+    """Hash every plaintext password in the document (employees and logins) and save once."""
+    logins = [login for login in data.get("logins", {}).values()
+              if login.get("password") and not is_hashed(login["password"])]
+    employees = [emp for _, emp in store_for(data).items()
+                 if emp.get("password") and not is_hashed(emp["password"])]
+    targets = logins + employees
+    hashes = hash_passwords([str(t["password"]) for t in targets])
+    with document_lock:
+        for entry, hashed in zip(targets, hashes):
+            entry["password"] = hashed
+        if employees:
+            employees_changed(data, [emp.get("code") for emp in employees])
+    if targets:
+        save_data(data)
+    return {"logins": len(logins), "employees": len(employees)}
@@ -1,17 +1,48 @@
 # utils/data_handler.py
 """
 Simple JSON data handler for employees.json
-- load_data(): returns full JSON as dict
-- save_data(data): writes dict back to file
-- helpers: find employee by code or username
+(or SQLite when PAYROLL_STORAGE=sqlite, same functions)
+- load_data(): returns full JSON as dict (cached until the file changes)
+- save_data(data): atomic, locked, version-checked write back to file
+- document_lock: held while the shared document is changed and while a
+  save serializes it
+- helpers: find employee by code or username (indexed, see employee_store)
 """
 
 import json
 import os
+import stat
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from typing import Optional
+from utils.employee_store import store_for
+from utils.instrumentation import span, timed
+from utils.passwords import hash_password
+from utils.records import Employee, compact_document, json_default
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
 
 DATA_PATH = os.path.join("data", "employees.json")
 
+# Storage backend: "json" (employees.json) or "sqlite" (see sqlite_backend)
+STORAGE_BACKEND = os.environ.get("PAYROLL_STORAGE", "json")
+SQLITE_PATH = os.environ.get("PAYROLL_SQLITE_PATH", os.path.join("data", "payroll.db"))
+
+_sqlite_backend = None
+
+def _sqlite():
+    """The process-wide SQLiteBackend, created on first use."""
+    global _sqlite_backend
+    if _sqlite_backend is None or _sqlite_backend.path != SQLITE_PATH:
+        from utils.sqlite_backend import SQLiteBackend
+        _sqlite_backend = SQLiteBackend(SQLITE_PATH)
+    return _sqlite_backend
+
 def ensure_data_path():
     folder = os.path.dirname(DATA_PATH)
     if folder and not os.path.exists(folder):
@@ -22,53 +53,249 @@ def ensure_data_path():
             "roles": {},
             "employees": [],
             "payroll_history": [],
-            "logins": { "admin": {"username":"admin", "password":"password"} }
+            "logins": { "admin": {"username":"admin", "password":hash_password("password")} }
         }
         with open(DATA_PATH, "w", encoding="utf-8") as f:
             json.dump(skeleton, f, indent=2)
 
+def _file_signature(path: str):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+# Every request thread and in-process job worker shares the same document.
+# Changes to it are made under document_lock, and saves serialize it under
+# the same lock, so a save never sees a half-applied change (or a dict
+# changing size mid-dump). Never call save_data() while holding it: a save
+# may be waiting for another thread's write, which needs the lock.
+document_lock = threading.RLock()
+
+# Process-level cache of the parsed document, reused until the file changes
+_cache = {"path": None, "signature": None, "data": None}
+_cache_stats = {"hits": 0, "misses": 0}
+_cache_lock = threading.Lock()
+
+@timed("load_data")
 def load_data() -> dict:
-    ensure_data_path()
+    """
+    Return the parsed data document. The same dict is shared between calls
+    and is only re-read when the file's mtime, size or inode changes.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        return _sqlite().load()
+
+    try:
+        signature = _file_signature(DATA_PATH)
+    except FileNotFoundError:
+        ensure_data_path()
+        signature = _file_signature(DATA_PATH)
+
+    with _cache_lock:
+        if _cache["data"] is not None and _cache["path"] == DATA_PATH and _cache["signature"] == signature:
+            _cache_stats["hits"] += 1
+            return _cache["data"]
+
+        _cache_stats["misses"] += 1
+        with open(DATA_PATH, "r", encoding="utf-8") as f, span("json_parse"):
+            data = compact_document(json.load(f))
+        _cache.update(path=DATA_PATH, signature=signature, data=data)
+        return data
+
+def invalidate_cache():
+    """Drop the cached document so the next load_data() re-reads the file."""
+    if STORAGE_BACKEND == "sqlite":
+        _sqlite().invalidate()
+    with _cache_lock:
+        _cache.update(path=None, signature=None, data=None)
+
+def cache_stats() -> dict:
+    """Hit/miss counters of the load_data() cache."""
+    if STORAGE_BACKEND == "sqlite":
+        return dict(_sqlite().stats)
+    with _cache_lock:
+        return dict(_cache_stats)
+
+class StaleDataError(Exception):
+    """Raised by save_data() when another writer saved the file after this document was loaded."""
+
+@contextmanager
+def _file_lock():
+    """Exclusive inter-process lock on DATA_PATH + ".lock" (thread-only where fcntl is unavailable)."""
+    if fcntl is None:
+        yield
+        return
+    with open(DATA_PATH + ".lock", "a+") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def _check_version(data: dict, signature):
+    """Optimistic concurrency check: the file on disk must still be at data["version"]."""
+    with _cache_lock:
+        known = _cache["signature"] if _cache["data"] is data and _cache["path"] == DATA_PATH else None
+    if known == signature:
+        return  # nobody touched the file since we last read or wrote it
     with open(DATA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+        on_disk = json.load(f).get("version", 0)
+    if on_disk != data.get("version", 0):
+        raise StaleDataError(f"{DATA_PATH} is at version {on_disk}, document was loaded at {data.get('version', 0)}")
 
-def save_data(data: dict):
+@timed("write_document")
+def _write_document(data: dict):
+    """Version-checked atomic write: temp file, fsync, os.replace, all under the file lock."""
     ensure_data_path()
-    with open(DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    folder = os.path.dirname(DATA_PATH) or "."
+    with _file_lock():
+        _check_version(data, _file_signature(DATA_PATH))
+        version = data.get("version", 0) + 1
+
+        with document_lock:
+            text = json.dumps({**data, "version": version}, indent=2, default=json_default)
+
+        fd, tmp_path = tempfile.mkstemp(prefix=".employees-", suffix=".tmp", dir=folder)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(DATA_PATH).st_mode))
+            os.replace(tmp_path, DATA_PATH)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+        with document_lock:
+            data["version"] = version
+        # our own write: keep serving this document instead of re-parsing it
+        with _cache_lock:
+            _cache.update(path=DATA_PATH, signature=_file_signature(DATA_PATH), data=data)
+
+# Saves arriving within this many seconds of each other share one write
+SAVE_COALESCE_WINDOW = 0.02
+
+class _SaveBatcher:
+    """
+    Group commit for save_data(). The first caller waits SAVE_COALESCE_WINDOW,
+    then writes once for everyone who joined meanwhile; all callers return
+    only after that write is on disk (or re-raise its error).
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._open = None      # batch still accepting callers
+        self._writing = False  # a batch is being written right now
+
+    def save(self, data: dict):
+        with self._cond:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = {"docs": {}, "errors": {}, "done": False}
+            batch["docs"][id(data)] = data
+            if not leader:
+                while not batch["done"]:
+                    self._cond.wait()
+
+        if leader:
+            if SAVE_COALESCE_WINDOW > 0:
+                time.sleep(SAVE_COALESCE_WINDOW)
+            with self._cond:
+                while self._writing:
+                    self._cond.wait()
+                self._open = None
+                self._writing = True
+            try:
+                for key, doc in batch["docs"].items():
+                    try:
+                        _write_document(doc)
+                    except Exception as e:
+                        batch["errors"][key] = e
+            finally:
+                with self._cond:
+                    batch["done"] = True
+                    self._writing = False
+                    self._cond.notify_all()
+
+        error = batch["errors"].get(id(data))
+        if error is not None:
+            # lost the race (StaleDataError) or the write failed (disk full, unserializable
+            # value, ...): the in-memory changes are not on disk, reload on next request
+            invalidate_cache()
+            raise error
+
+_batcher = _SaveBatcher()
+
+@timed("save_data")
+def save_data(data: dict):
+    """
+    Persist the document atomically. Raises StaleDataError if another
+    process saved a newer version since this document was loaded.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        _sqlite().save(data)
+    else:
+        _batcher.save(data)
 
 def find_employee_by_code(data: dict, code: int) -> Optional[dict]:
-    for e in data.get("employees", []):
-        if int(e.get("code", -1)) == int(code):
-            return e
-    return None
+    return store_for(data).get(code)
 
 def find_employee_by_username(data: dict, username: str) -> Optional[dict]:
-    for e in data.get("employees", []):
-        if e.get("username") == username:
-            return e
-    return None
+    return store_for(data).get_by_username(username)
+
+@contextmanager
+def _changing_document():
+    """document_lock around an in-place change; if it fails half way (e.g. a store listener raises), drop the cached document."""
+    with document_lock:
+        try:
+            yield
+        except BaseException:
+            invalidate_cache()  # the shared document may hold the unsaved change: reload on next request
+            raise
+
+def _mark_dirty(data: dict, code):
+    if STORAGE_BACKEND == "sqlite":
+        _sqlite().mark_dirty(data, code)
+
+def _as_employee(emp) -> Employee:
+    return emp if isinstance(emp, Employee) else Employee.from_dict(emp)
 
 def update_employee(data: dict, updated_emp: dict):
     """Replace the employee entry (matched by code) with updated_emp and persist in-memory dict."""
-    arr = data.get("employees", [])
-    for i, e in enumerate(arr):
-        if int(e.get("code", -1)) == int(updated_emp.get("code", -1)):
-            arr[i] = updated_emp
-            return True
     # not found -> append
-    arr.append(updated_emp)
+    updated_emp = _as_employee(updated_emp)
+    with _changing_document():
+        store_for(data).put(updated_emp)
+        _mark_dirty(data, updated_emp.get("code", -1))
     return True
 
+def employees_changed(data: dict, codes):
+    """
+    Bulk form of update_employee() for records already modified in place:
+    re-index once (listeners such as the aggregates recompute in one pass).
+    """
+    with _changing_document():
+        store_for(data).rebuild()
+        for code in codes:
+            _mark_dirty(data, code)
+
 def add_employee(data: dict, new_emp: dict):
     """Add a new employee to the data and persist."""
-    employees = data.get("employees", [])
-    employees.append(new_emp)
-    data["employees"] = employees
+    new_emp = _as_employee(new_emp)
+    with _changing_document():
+        store_for(data).put(new_emp)
+        _mark_dirty(data, new_emp.get("code", -1))
     save_data(data)
 
 def delete_employee(data: dict, emp_code: int):
     """Delete an employee by their code."""
-    employees = [e for e in data.get("employees", []) if int(e.get("code", -1)) != int(emp_code)]
-    data["employees"] = employees
+    with _changing_document():
+        store_for(data).remove(emp_code)
+        _mark_dirty(data, emp_code)
     save_data(data)
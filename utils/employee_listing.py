@@ -0,0 +1,150 @@
+# utils/employee_listing.py
+"""
+Server-side employee listing for the admin dashboard.
+- list_employees(data, ...): one page of employees, filtered by role /
+  department / name search, sorted, with an opaque cursor for the next page
+- ListingIndex: sorted orders per field and a name-token index, built from
+  the EmployeeStore and refreshed lazily after it changes
+"""
+
+import base64
+import bisect
+import json
+import threading
+
+from utils.employee_store import store_for
+
+SORT_FIELDS = ("code", "name", "role", "department", "exp", "working_hours", "loan_balance")
+MAX_PAGE_SIZE = 500
+
+# Fields sent to the browser (never passwords)
+LISTING_FIELDS = ("code", "name", "role", "department", "exp", "working_hours", "loan_balance")
+
+def _sort_value(emp: dict, field: str):
+    value = emp.get(field)
+    if field in ("name", "role", "department"):
+        return str(value or "").lower()
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _tokens(name) -> list:
+    return str(name or "").lower().split()
+
+def encode_cursor(key, code: int) -> str:
+    raw = json.dumps([key, code]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str) -> tuple:
+    key, code = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    return key, code
+
+class ListingIndex:
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._version = None
+
+    def _refresh(self):
+        if self._version == self.store.version:
+            return
+        with self._lock:
+            if self._version == self.store.version:
+                return
+            self._orders = {}
+            tokens = []
+            for code, emp in self.store.items():
+                for token in _tokens(emp.get("name")):
+                    tokens.append((token, code))
+            tokens.sort()
+            self._tokens = tokens
+            self._token_keys = [t for t, _ in tokens]
+            self._version = self.store.version
+
+    def order(self, field: str) -> list:
+        """(value, code) entries sorted for this field, built on first use."""
+        self._refresh()
+        cached = self._orders.get(field)
+        if cached is None:
+            entries = sorted((_sort_value(emp, field), code) for code, emp in self.store.items())
+            cached = self._orders[field] = entries
+        return cached
+
+    def search(self, query: str) -> set:
+        """Codes whose name has a word starting with every word of the query."""
+        self._refresh()
+        result = None
+        for word in _tokens(query):
+            lo = bisect.bisect_left(self._token_keys, word)
+            hi = bisect.bisect_left(self._token_keys, word + "\uffff")
+            codes = {code for _, code in self._tokens[lo:hi]}
+            result = codes if result is None else result & codes
+        return result if result is not None else set()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def listing_index_for(data: dict) -> ListingIndex:
+    store = store_for(data)
+    index = _indexes.get(id(store))
+    if index is None or index.store is not store:
+        with _indexes_lock:
+            _indexes.clear()  # only the current store is ever listed
+            index = _indexes[id(store)] = ListingIndex(store)
+    return index
+
+def list_employees(data: dict, roles: list = None, department: str = None, q: str = None,
+                   sort: str = "code", descending: bool = False, limit: int = 50, cursor: str = None) -> dict:
+    """Return {"items", "next_cursor", "total"} for one page of the admin employee table."""
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"cannot sort by {sort!r}")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    store = store_for(data)
+    index = listing_index_for(data)
+
+    # candidate set from the hash / token indexes; None means everyone
+    candidates = None
+    if roles:
+        candidates = set().union(*(store.codes_for_role(r) for r in roles))
+    if department:
+        codes = store.codes_for_department(department)
+        candidates = codes if candidates is None else candidates & codes
+    if q and q.strip():
+        codes = index.search(q)
+        candidates = codes if candidates is None else candidates & codes
+
+    if candidates is not None and len(candidates) * 8 < len(store):
+        # selective filter: sorting the few matches beats walking the full order
+        entries = sorted((_sort_value(store.get(code), sort), code) for code in candidates)
+        candidates = None
+    else:
+        entries = index.order(sort)
+    total = len(entries) if candidates is None else len(candidates)
+
+    if descending:
+        start = len(entries)
+        if cursor:
+            start = bisect.bisect_left(entries, tuple(decode_cursor(cursor)))
+        walk = (entries[i] for i in range(start - 1, -1, -1))
+    else:
+        start = bisect.bisect_right(entries, tuple(decode_cursor(cursor))) if cursor else 0
+        walk = (entries[i] for i in range(start, len(entries)))
+
+    items, last, has_more = [], None, False
+    for key, code in walk:
+        if candidates is not None and code not in candidates:
+            continue
+        if len(items) == limit:
+            has_more = True
+            break
+        emp = store.get(code)
+        items.append({field: emp.get(field) for field in LISTING_FIELDS})
+        last = (key, code)
+
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(*last) if has_more else None,
+        "total": total,
+    }
@@ -0,0 +1,157 @@
+# utils/employee_store.py
+"""
+In-memory indexes over the "employees" list of a loaded data document.
+- EmployeeStore(data): hash indexes by code and username, secondary
+  indexes by role and department, kept consistent on put/remove
+- listeners: callbacks told about every put/remove (see payroll_aggregates)
+- store_for(data): the shared store for a document, built once and reused
+  for as long as the same document object is in use
+"""
+
+import threading
+from typing import Optional
+
+def _code_of(emp: dict) -> int:
+    return int(emp.get("code", -1))
+
+class EmployeeStore:
+    def __init__(self, data: dict):
+        self.data = data
+        self.version = 0  # bumped on every change, lets other caches notice
+        self.listeners = []  # callables (code, emp or None) run after put/remove; code None = rebuilt
+        self.rebuild()
+
+    def rebuild(self):
+        """(Re)build every index from data["employees"]."""
+        self._by_code = {}
+        self._position = {}
+        self._by_username = {}
+        self._by_role = {}
+        self._by_department = {}
+        self._keys = {}
+        self._employees = self.data.get("employees", [])
+        for i, emp in enumerate(self._employees):
+            code = _code_of(emp)
+            # first record wins on duplicate codes, like the old linear scan
+            if code in self._by_code:
+                continue
+            self._by_code[code] = emp
+            self._position[code] = i
+            self._index(code, emp)
+        self._size = len(self._employees)
+        self.version += 1
+        self._notify(None, None)
+
+    def is_current(self, data: dict) -> bool:
+        """False once the document or its employees list was swapped or resized behind our back."""
+        employees = data.get("employees", [])
+        return data is self.data and employees is self._employees and len(employees) == self._size
+
+    # ---------------------- internal index upkeep ----------------------
+    def _index(self, code: int, emp: dict):
+        username = emp.get("username")
+        role = emp.get("role")
+        department = emp.get("department")
+        self._keys[code] = (username, role, department)
+        self._by_username.setdefault(username, code)
+        self._by_role.setdefault(role, set()).add(code)
+        self._by_department.setdefault(department, set()).add(code)
+
+    def _unindex(self, code: int):
+        username, role, department = self._keys.pop(code)
+        if self._by_username.get(username) == code:
+            del self._by_username[username]
+        for index, key in ((self._by_role, role), (self._by_department, department)):
+            codes = index.get(key)
+            if codes is not None:
+                codes.discard(code)
+                if not codes:
+                    del index[key]
+
+    # ---------------------- lookups ----------------------
+    def get(self, code) -> Optional[dict]:
+        return self._by_code.get(int(code))
+
+    def get_by_username(self, username: str) -> Optional[dict]:
+        code = self._by_username.get(username)
+        return None if code is None else self._by_code[code]
+
+    def position_of(self, code) -> Optional[int]:
+        """Index of the record in data["employees"]."""
+        return self._position.get(int(code))
+
+    def codes_for_role(self, role: str) -> set:
+        return set(self._by_role.get(role, ()))
+
+    def codes_for_department(self, department: str) -> set:
+        return set(self._by_department.get(department, ()))
+
+    def roles(self) -> list:
+        return list(self._by_role.keys())
+
+    def departments(self) -> list:
+        return list(self._by_department.keys())
+
+    def items(self):
+        """(code, employee) pairs, one per indexed code."""
+        return self._by_code.items()
+
+    def __len__(self):
+        return len(self._by_code)
+
+    # ---------------------- mutations ----------------------
+    def put(self, emp: dict):
+        """Insert emp, or replace the record with the same code in place."""
+        employees = self.data.setdefault("employees", self._employees)
+        self._employees = employees
+        code = _code_of(emp)
+        if code in self._by_code:
+            self._unindex(code)
+            employees[self._position[code]] = emp
+        else:
+            self._position[code] = len(employees)
+            employees.append(emp)
+        self._by_code[code] = emp
+        self._index(code, emp)
+        self._size = len(employees)
+        self.version += 1
+        self._notify(code, emp)
+
+    def remove(self, code) -> Optional[dict]:
+        """Remove every record with this code; returns the indexed one."""
+        code = int(code)
+        emp = self._by_code.pop(code, None)
+        if emp is None:
+            return None
+        self._unindex(code)
+        del self._position[code]
+        employees = self._employees
+        employees[:] = [e for e in employees if _code_of(e) != code]
+        # positions after the removed record(s) shifted
+        for i, e in enumerate(employees):
+            c = _code_of(e)
+            if self._by_code.get(c) is e:
+                self._position[c] = i
+        self._size = len(employees)
+        self.version += 1
+        self._notify(code, None)
+        return emp
+
+    def _notify(self, code: int, emp: Optional[dict]):
+        for listener in self.listeners:
+            listener(code, emp)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def store_for(data: dict) -> EmployeeStore:
+    """Return the shared EmployeeStore for this document, building it on first use."""
+    global _store
+    store = _store
+    if store is None or not store.is_current(data):
+        with _store_lock:
+            if _store is None or not _store.is_current(data):
+                _store = EmployeeStore(data)
+            store = _store
+    return store
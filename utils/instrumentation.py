@@ -0,0 +1,249 @@
+# utils/instrumentation.py
+"""
+Lightweight timing instrumentation for the payroll app.
+- Histogram: Prometheus-style cumulative latency buckets
+- span(name) / timed(name): time a block / function into the span histograms
+  and into the current request's Server-Timing breakdown
+- instrument_app(app, show_timing): per-route latency histograms, template
+  render spans, the Server-Timing header (only where show_timing() allows it)
+  and the opt-in per-request cProfile dump
+- register_gauges(prefix, fn): extra gauges collected on every /metrics
+  scrape (e.g. the ASGI pools, see utils/asgi_bridge.py)
+- render_metrics(): everything above in Prometheus text format (/metrics)
+
+Configured from the environment:
+  PAYROLL_METRICS=0            turn all timing off (spans become a flag check)
+  PAYROLL_PROFILE_DIR          where .prof files go (default: profiles)
+  PAYROLL_PROFILE_SAMPLE=0.01  profile this fraction of requests
+  PAYROLL_PROFILE_HEADER=1     also profile requests sent with "X-Profile: 1"
+  PAYROLL_SERVER_TIMING        "restricted" (default: where show_timing() says so),
+                               "all" or "off"
+"""
+
+import bisect
+import cProfile
+import datetime
+import functools
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+ENABLED = os.environ.get("PAYROLL_METRICS", "1") != "0"
+PROFILE_DIR = os.environ.get("PAYROLL_PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PAYROLL_PROFILE_SAMPLE", "0") or 0)
+PROFILE_HEADER_ENABLED = os.environ.get("PAYROLL_PROFILE_HEADER", "0") == "1"
+SERVER_TIMING = os.environ.get("PAYROLL_SERVER_TIMING", "restricted")
+
+# seconds; upper bounds of the histogram buckets (+Inf is implicit)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self) -> tuple:
+        """(cumulative bucket counts incl. +Inf, sum, count)"""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+_route_histograms = {}   # (method, route, status) -> Histogram
+_span_histograms = {}    # span name -> Histogram
+_registry_lock = threading.Lock()
+_local = threading.local()  # per-thread span totals of the request in flight
+_gauge_sources = {}      # prefix -> fn() returning {name: value}
+
+def _histogram(registry: dict, key) -> Histogram:
+    histogram = registry.get(key)
+    if histogram is None:
+        with _registry_lock:
+            histogram = registry.setdefault(key, Histogram())
+    return histogram
+
+def record_span(name: str, seconds: float):
+    _histogram(_span_histograms, name).observe(seconds)
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        spans[name] = spans.get(name, 0.0) + seconds
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as span `name`."""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+def timed(name: str):
+    """Decorator: time every call of the function as span `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_span(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+# ---------------------- FLASK HOOKS ----------------------
+_profile_lock = threading.Lock()  # one cProfile at a time
+
+def _wants_profile(request) -> bool:
+    if PROFILE_HEADER_ENABLED and request.headers.get("X-Profile") == "1":
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+def _dump_profile(profiler, request, elapsed: float) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    endpoint = re.sub(r"[^A-Za-z0-9_.-]+", "_", request.endpoint or "unmatched")
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    path = os.path.join(PROFILE_DIR, f"{stamp}_{endpoint}_{elapsed * 1000:.0f}ms.prof")
+    profiler.dump_stats(path)
+    return path
+
+def _server_timing_allowed(show_timing) -> bool:
+    # span names and durations reveal internals (e.g. cache hits): not for every client
+    if SERVER_TIMING == "all":
+        return True
+    return SERVER_TIMING == "restricted" and show_timing is not None and show_timing()
+
+def instrument_app(app, show_timing=None):
+    """
+    Register the request timing, template span and profiling hooks on a Flask app.
+    show_timing(): called in the request context, True if this client may
+    see the Server-Timing header (see PAYROLL_SERVER_TIMING).
+    """
+    from flask import g, request, before_render_template, template_rendered
+
+    @app.before_request
+    def _start_timer():
+        if not ENABLED:
+            return
+        g._instrument_started = time.perf_counter()
+        _local.spans = {}
+        if _wants_profile(request) and _profile_lock.acquire(blocking=False):
+            g._instrument_profiler = cProfile.Profile()
+            g._instrument_profiler.enable()
+
+    @app.after_request
+    def _stop_timer(response):
+        started = g.pop("_instrument_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        profiler = g.pop("_instrument_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+            response.headers["X-Profile-File"] = os.path.basename(_dump_profile(profiler, request, elapsed))
+
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        _histogram(_route_histograms, (request.method, route, response.status_code)).observe(elapsed)
+
+        spans = getattr(_local, "spans", None) or {}
+        _local.spans = None
+        if not _server_timing_allowed(show_timing):
+            return response
+        timings = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in spans.items()]
+        timings.append(f"total;dur={elapsed * 1000:.2f}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+        return response
+
+    @app.teardown_request
+    def _discard(exc):
+        # after_request did not run (unhandled error): don't leak the profiler
+        profiler = g.pop("_instrument_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+        _local.spans = None
+
+    def _template_started(sender, template, context, **extra):
+        if ENABLED:
+            g._instrument_template_started = time.perf_counter()
+
+    def _template_done(sender, template, context, **extra):
+        started = g.pop("_instrument_template_started", None)
+        if started is not None:
+            record_span("render_template", time.perf_counter() - started)
+
+    before_render_template.connect(_template_started, app, weak=False)
+    template_rendered.connect(_template_done, app, weak=False)
+
+# ---------------------- PROMETHEUS TEXT ----------------------
+def register_gauges(prefix: str, fn):
+    """Report fn()'s {name: value} as <prefix>_<name> gauges on every render_metrics()."""
+    with _registry_lock:
+        _gauge_sources[prefix] = fn
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _histogram_lines(metric: str, labels: str, histogram: Histogram) -> list:
+    cumulative, total, count = histogram.snapshot()
+    bounds = [repr(b) for b in histogram.buckets] + ["+Inf"]
+    sep = "," if labels else ""
+    lines = [f'{metric}_bucket{{{labels}{sep}le="{le}"}} {n}' for le, n in zip(bounds, cumulative)]
+    lines.append(f"{metric}_sum{{{labels}}} {total}")
+    lines.append(f"{metric}_count{{{labels}}} {count}")
+    return lines
+
+def render_metrics(extra_gauges: dict = None) -> str:
+    """All histograms (plus optional {name: value} gauges) in Prometheus text exposition format."""
+    # copy the registries first: a request may add a route or span while we render
+    with _registry_lock:
+        routes = sorted(_route_histograms.items())
+        spans = sorted(_span_histograms.items())
+        sources = list(_gauge_sources.items())
+    lines = [
+        "# HELP payroll_request_duration_seconds Request latency per route.",
+        "# TYPE payroll_request_duration_seconds histogram",
+    ]
+    for (method, route, status), histogram in routes:
+        labels = f'method="{method}",route="{_label_value(route)}",status="{status}"'
+        lines.extend(_histogram_lines("payroll_request_duration_seconds", labels, histogram))
+
+    lines.append("# HELP payroll_span_duration_seconds Time spent in instrumented operations.")
+    lines.append("# TYPE payroll_span_duration_seconds histogram")
+    for name, histogram in spans:
+        lines.extend(_histogram_lines("payroll_span_duration_seconds", f'span="{_label_value(name)}"', histogram))
+
+    gauges = dict(extra_gauges or {})
+    for prefix, fn in sources:
+        gauges.update({f"{prefix}_{name}": value for name, value in fn().items()})
+    for name, value in gauges.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+def reset_metrics():
+    with _registry_lock:
+        _route_histograms.clear()
+        _span_histograms.clear()
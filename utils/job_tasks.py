@@ -0,0 +1,62 @@
+# utils/job_tasks.py
+"""
+Handlers for the background jobs (see utils/jobs.py).
+- payslip_pdf: one employee's payslip into the content-addressed cache
+- bulk_payslips: every payslip of a period, optionally zipped
+- charts: render the dashboard chart files
+- import_employees: import an uploaded CSV / JSONL file, then delete it
+- payrun: the month-end pay run
+Handlers return JSON; a produced file is reported as result["file"].
+"""
+
+import os
+
+from utils.bulk_io import iter_employee_rows, import_employees
+from utils.bulk_payslips import generate_bulk_payslips, BULK_FOLDER
+from utils.chart_generator import generate_all_charts
+from utils.data_handler import load_data, find_employee_by_code
+from utils.jobs import job_handler
+from utils.payroll_records import payroll_breakdown, issue_payroll_records, current_period, parse_period
+from utils.payslip_cache import cached_payslip_pdf
+
+UPLOAD_FOLDER = os.path.join("data", "uploads")
+
+@job_handler("payslip_pdf")
+def payslip_pdf_job(params: dict, progress):
+    data = load_data()
+    emp = find_employee_by_code(data, params["code"])
+    if emp is None:
+        raise LookupError(f"employee {params['code']} not found")
+    period = params.get("period") or current_period()
+    path = cached_payslip_pdf(emp, payroll_breakdown(data, emp, period), period)
+    return {"file": path, "mimetype": "application/pdf"}
+
+@job_handler("bulk_payslips")
+def bulk_payslips_job(params: dict, progress):
+    period = parse_period(params.get("period") or current_period())  # part of the ZIP path
+    zip_path = os.path.join(BULK_FOLDER, f"Payslips_{period}.zip") if params.get("zip") else None
+    for event in generate_bulk_payslips(load_data(), period, workers=params.get("workers"), zip_path=zip_path):
+        if not event["finished"]:
+            progress({"done": event["done"], "total": event["total"], "elapsed": event["elapsed"]})
+    result = {key: event[key] for key in ("period", "total", "rendered", "skipped", "elapsed", "pdfs_per_sec")}
+    if zip_path:
+        result.update(file=zip_path, mimetype="application/zip")
+    return result
+
+@job_handler("charts")
+def charts_job(params: dict, progress):
+    return {"charts": generate_all_charts(load_data())}
+
+@job_handler("import_employees")
+def import_employees_job(params: dict, progress):
+    path = params["path"]
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as stream:
+            return import_employees(load_data(), iter_employee_rows(stream, params.get("format", "csv")))
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+@job_handler("payrun")
+def payrun_job(params: dict, progress):
+    return issue_payroll_records(load_data(), params.get("period") or current_period())
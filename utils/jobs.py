@@ -0,0 +1,280 @@
+# utils/jobs.py
+"""
+Local background jobs, persisted in SQLite (no external broker).
+- enqueue(kind, params, owner): queue a job (or return the identical one
+  already queued / running) and make sure this process has workers
+- get_job(job_id): status, progress, result or error
+- JobWorker: thread that claims queued jobs one at a time; run them inside
+  the web process (PAYROLL_JOB_WORKERS threads, started lazily) and/or in a
+  dedicated `flask --app app jobs-worker` process
+- @job_handler(kind): register fn(params, progress) -> JSON-able result
+
+Claiming is a BEGIN IMMEDIATE transaction, so any number of threads and
+processes can share one queue. A running job whose heartbeat is older than
+JOB_STALE_SECONDS (its worker died) is put back in the queue.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+JOBS_DB_PATH = os.environ.get("PAYROLL_JOBS_DB", os.path.join("data", "jobs.db"))
+JOB_WORKERS = int(os.environ.get("PAYROLL_JOB_WORKERS", "1"))
+JOB_POLL_INTERVAL = 0.5
+JOB_STALE_SECONDS = 600
+JOB_HEARTBEAT_INTERVAL = 30
+JOB_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    owner TEXT,
+    status TEXT NOT NULL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_kind ON jobs(kind, params, status);
+"""
+
+STATUSES = ("queued", "running", "done", "failed")
+
+JOB_HANDLERS = {}
+
+def job_handler(kind: str):
+    """Register fn(params: dict, progress: callable) as the handler of `kind`."""
+    def decorator(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"))
+
+def _iso(ts):
+    return datetime.datetime.fromtimestamp(ts).isoformat(timespec="seconds") if ts else None
+
+# ---------------------- CONNECTION ----------------------
+_local = threading.local()
+
+def _conn() -> sqlite3.Connection:
+    """One connection per thread and process (path changes are picked up, e.g. in tests)."""
+    key = (os.getpid(), JOBS_DB_PATH)
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "key", None) != key:
+        folder = os.path.dirname(JOBS_DB_PATH)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(JOBS_DB_PATH, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn, _local.key = conn, key
+    return conn
+
+def _row_to_job(row) -> dict:
+    (job_id, kind, params, owner, status, progress, result, error, attempts,
+     worker, created_at, started_at, heartbeat_at, finished_at) = row
+    return {
+        "id": job_id,
+        "kind": kind,
+        "params": json.loads(params),
+        "owner": owner,
+        "status": status,
+        "progress": json.loads(progress) if progress else None,
+        "result": json.loads(result) if result else None,
+        "error": error,
+        "attempts": attempts,
+        "worker": worker,
+        "created_at": _iso(created_at),
+        "started_at": _iso(started_at),
+        "finished_at": _iso(finished_at),
+    }
+
+_COLUMNS = ("id, kind, params, owner, status, progress, result, error, attempts, "
+            "worker, created_at, started_at, heartbeat_at, finished_at")
+
+# ---------------------- QUEUE ----------------------
+def enqueue(kind: str, params: dict = None, owner: str = None, start_workers: bool = True) -> dict:
+    """Queue a job; an identical job that is still queued or running is returned instead."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"unknown job kind {kind!r}")
+    params_json = _dumps(params or {})
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            f"SELECT {_COLUMNS} FROM jobs WHERE kind = ? AND params = ? AND status IN ('queued', 'running') "
+            "ORDER BY created_at LIMIT 1", (kind, params_json)
+        ).fetchone()
+        if row is None:
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, owner, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, kind, params_json, owner, time.time()),
+            )
+            row = conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    if start_workers:
+        ensure_workers()
+    return _row_to_job(row)
+
+def get_job(job_id: str):
+    row = _conn().execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
+
+def list_jobs(status: str = None, limit: int = 50) -> list:
+    if status:
+        rows = _conn().execute(f"SELECT {_COLUMNS} FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                               (status, limit))
+    else:
+        rows = _conn().execute(f"SELECT {_COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+    return [_row_to_job(row) for row in rows]
+
+def requeue_stale(stale_seconds: float = JOB_STALE_SECONDS) -> int:
+    """Put jobs whose worker stopped sending heartbeats back in the queue (or fail them after JOB_MAX_ATTEMPTS)."""
+    conn = _conn()
+    cutoff = time.time() - stale_seconds
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'worker lost too many times', finished_at = ? "
+            "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+            (time.time(), cutoff, JOB_MAX_ATTEMPTS),
+        )
+        count = conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat_at < ?",
+            (cutoff,),
+        ).rowcount
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return count
+
+def purge_jobs(older_than_days: float = 7) -> int:
+    """Delete finished jobs older than the given age."""
+    cutoff = time.time() - older_than_days * 86400
+    return _conn().execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                           (cutoff,)).rowcount
+
+# ---------------------- WORKER ----------------------
+def _claim(worker_name: str):
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            f"SELECT {_COLUMNS} FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker_name, now, now, row[0]),
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return _row_to_job(row) if row else None
+
+def _finish(job_id: str, worker_name: str, status: str, result=None, error: str = None):
+    _conn().execute(
+        "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND worker = ?",
+        (status, _dumps(result) if result is not None else None, error, time.time(), job_id, worker_name),
+    )
+
+def run_job(job: dict, worker_name: str):
+    """Run one claimed job with its handler and record the outcome."""
+    def progress(info: dict):
+        _conn().execute("UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ? AND worker = ?",
+                        (_dumps(info), time.time(), job["id"], worker_name))
+
+    def beat(stop: threading.Event):
+        # keeps the job from looking stale while a handler runs without reporting progress
+        while not stop.wait(JOB_HEARTBEAT_INTERVAL):
+            _conn().execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ?",
+                            (time.time(), job["id"], worker_name))
+
+    handler = JOB_HANDLERS.get(job["kind"])
+    if handler is None:
+        _finish(job["id"], worker_name, "failed", error=f"no handler for {job['kind']!r}")
+        return
+    stop = threading.Event()
+    threading.Thread(target=beat, args=(stop,), daemon=True).start()
+    try:
+        result = handler(job["params"], progress)
+    except Exception as e:
+        traceback.print_exc()
+        _finish(job["id"], worker_name, "failed", error=f"{type(e).__name__}: {e}")
+    else:
+        _finish(job["id"], worker_name, "done", result=result)
+    finally:
+        stop.set()
+
+class JobWorker(threading.Thread):
+    def __init__(self, name: str = None, poll_interval: float = JOB_POLL_INTERVAL):
+        super().__init__(name=name or f"job-worker-{uuid.uuid4().hex[:6]}", daemon=True)
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+
+    @property
+    def worker_name(self) -> str:
+        return f"{os.getpid()}:{self.name}"
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run_once(self) -> bool:
+        """Claim and run one job; False when the queue is empty."""
+        job = _claim(self.worker_name)
+        if job is None:
+            return False
+        run_job(job, self.worker_name)
+        return True
+
+    def run(self):
+        requeue_stale()
+        while not self._stop_event.is_set():
+            try:
+                if not self.run_once():
+                    self._stop_event.wait(self.poll_interval)
+            except sqlite3.OperationalError:
+                traceback.print_exc()  # e.g. database locked for longer than the timeout
+                self._stop_event.wait(self.poll_interval)
+
+
+_workers = {"pid": None, "threads": []}
+_workers_lock = threading.Lock()
+
+def ensure_workers(count: int = None) -> list:
+    """Start this process's in-app workers once (again after a fork)."""
+    count = JOB_WORKERS if count is None else count
+    with _workers_lock:
+        if _workers["pid"] != os.getpid():
+            _workers.update(pid=os.getpid(), threads=[])
+        alive = [t for t in _workers["threads"] if t.is_alive()]
+        while len(alive) < count:
+            worker = JobWorker()
+            worker.start()
+            alive.append(worker)
+        _workers["threads"] = alive
+        return alive
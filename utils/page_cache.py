@@ -0,0 +1,229 @@
+# utils/page_cache.py
+"""
+Whole-page cache for the per-employee HTML pages (employee dashboard,
+payslip view), which only change when the employee, their role's rate or
+the pay period does.
+- page_version(...): hash of everything the page shows (employee fields,
+  breakdown, period, date, template files, request variant such as the
+  viewer's role); doubles as the ETag, so a revalidation renders nothing
+- PageCache.get(key, version) / put(...): bounded in-process LRU, plus an
+  optional on-disk tier shared by all workers (PAYROLL_PAGE_CACHE_DIR)
+- template_stamp(env, name): template file stamp to pass as a variant
+- watch(data): drop an employee's pages on EmployeeStore put/remove
+  (update_employee, delete_employee, imports), everything on a rebuild,
+  and a role's pages when its hourly_rate changes
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.employee_store import store_for
+
+PAGE_CACHE_SIZE = int(os.environ.get("PAYROLL_PAGE_CACHE_SIZE", "1024"))
+PAGE_CACHE_DIR = os.environ.get("PAYROLL_PAGE_CACHE_DIR", "")  # empty: memory only
+PAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+PAGES = ("employee_dashboard", "payslip")  # cached page names; an employee's pages are dropped by key
+
+class CachedPage:
+    __slots__ = ("body", "etag", "last_modified", "role")
+
+    def __init__(self, body: bytes, etag: str, last_modified: float, role=None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.role = role
+
+def page_version(page: str, employee, breakdown, period: str, **variant) -> str:
+    payload = {
+        "page": page,
+        "period": period,
+        "employee": {k: v for k, v in employee.items() if k != "password"},
+        "breakdown": dict(breakdown.items()),
+        "variant": variant,
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+def template_stamp(env, name: str) -> tuple:
+    """(name, mtime, size) of a Jinja template file, so edited templates get new versions."""
+    filename = env.get_template(name).filename
+    st = os.stat(filename)
+    return (name, st.st_mtime_ns, st.st_size)
+
+def _rates(roles: dict) -> dict:
+    return {name: role.get("hourly_rate", 300) for name, role in roles.items()}
+
+class PageCache:
+    def __init__(self, maxsize: int = PAGE_CACHE_SIZE, folder: str = PAGE_CACHE_DIR,
+                 max_bytes: int = PAGE_CACHE_MAX_BYTES, pages=PAGES):
+        self.maxsize = maxsize
+        self.pages = set(pages)
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (page, code) -> CachedPage, one version per page and employee
+        self._lock = threading.Lock()
+        self._store = None
+        self._rates = None
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "invalidations": 0}
+
+    # ---------------------- lookups ----------------------
+    def get(self, page: str, code, version: str, role=None):
+        """The cached page if it is at `version`, else None."""
+        key = (page, int(code))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.etag == version:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry
+        entry = self._read_disk(page, code, version, role)
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, page: str, code, version: str, body: bytes, role=None) -> CachedPage:
+        entry = CachedPage(body, version, time.time(), role)
+        self._write_disk(page, code, entry)
+        with self._lock:
+            self.pages.add(page)
+            self._remember((page, int(code)), entry)
+        return entry
+
+    def _remember(self, key, entry: CachedPage):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    # ---------------------- invalidation ----------------------
+    def watch(self, data: dict):
+        """Follow this document's store and role rates (cheap when nothing changed)."""
+        store = store_for(data)
+        if store is not self._store:
+            with self._lock:
+                if store is not self._store:
+                    if self._store is not None and self._on_change in self._store.listeners:
+                        self._store.listeners.remove(self._on_change)
+                    store.listeners.append(self._on_change)
+                    self._store = store
+        rates = _rates(data.get("roles", {}))
+        if rates != self._rates:
+            if self._rates is not None:
+                for role in set(rates) | set(self._rates):
+                    if rates.get(role) != self._rates.get(role):
+                        self.invalidate_role(role)
+            self._rates = rates
+
+    def _on_change(self, code, emp):
+        if code is None:
+            self.clear()  # bulk re-index: anything may have changed
+        else:
+            self.invalidate_employee(code)
+
+    def invalidate_employee(self, code):
+        code = int(code)
+        with self._lock:
+            pages = list(self.pages)
+            for page in pages:
+                self._entries.pop((page, code), None)
+            self.stats["invalidations"] += 1
+        for page in pages:
+            self._remove_disk(page, code)
+
+    def invalidate_role(self, role: str):
+        with self._lock:
+            codes = {key[1] for key, entry in self._entries.items() if entry.role == role}
+        for code in codes:
+            self.invalidate_employee(code)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats["invalidations"] += 1
+        self._clear_disk()
+
+    def cache_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats, size=len(self._entries), maxsize=self.maxsize)
+
+    # ---------------------- disk tier ----------------------
+    # one file per page and employee, named from the key alone so any worker can
+    # drop it; the first line holds the version the body was rendered at
+    def _path(self, page: str, code) -> str:
+        return os.path.join(self.folder, f"{page}_{int(code)}.html")
+
+    def _read_disk(self, page: str, code, version: str, role=None):
+        if not self.folder:
+            return None
+        path = self._path(page, code)
+        try:
+            with open(path, "rb") as f:
+                if f.readline().rstrip(b"\n").decode("ascii", "replace") != version:
+                    return None  # rendered at another version
+                body = f.read()
+            last_modified = os.stat(path).st_mtime
+            os.utime(path, (time.time(), last_modified))  # recently read, for eviction
+        except FileNotFoundError:
+            return None
+        return CachedPage(body, version, last_modified, role)
+
+    def _write_disk(self, page: str, code, entry: CachedPage):
+        if not self.folder:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(page, code)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(entry.etag.encode("ascii") + b"\n")
+            f.write(entry.body)
+        os.utime(tmp_path, (entry.last_modified, entry.last_modified))
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _remove_disk(self, page: str, code):
+        """Delete one on-disk page; other workers then miss too."""
+        if not self.folder:
+            return
+        try:
+            os.unlink(self._path(page, code))
+        except FileNotFoundError:
+            pass  # not cached, or another worker removed it first
+
+    def _clear_disk(self):
+        if not self.folder or not os.path.isdir(self.folder):
+            return
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.name.endswith(".html"):
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass  # another worker removed it first
+
+    def _evict_disk(self):
+        entries = []
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.name.endswith(".html"):
+                    st = entry.stat()
+                    entries.append((st.st_atime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):  # least recently read first
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+page_cache = PageCache()
@@ -0,0 +1,66 @@
+# utils/passwords.py
+"""
+Password hashing (PBKDF2-HMAC-SHA256 from hashlib).
+- hash_password(password): "pbkdf2_sha256$<iterations>$<salt>$<hash>"
+- hash_passwords(passwords): the same for many passwords, hashed in parallel
+- verify_password(password, stored): constant-time check; also accepts a
+  legacy plaintext value so accounts keep working until they are migrated
+- is_hashed(stored) / needs_rehash(stored): for the migration
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITHM = "pbkdf2_sha256"
+PASSWORD_ITERATIONS = int(os.environ.get("PAYROLL_PASSWORD_ITERATIONS", "600000"))
+SALT_BYTES = 16
+# threads for hash_passwords(): hashlib releases the GIL while it hashes
+HASH_WORKERS = int(os.environ.get("PAYROLL_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def hash_password(password: str, iterations: int = None) -> str:
+    iterations = iterations or PASSWORD_ITERATIONS
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(digest)}"
+
+def hash_passwords(passwords: list, workers: int = None) -> list:
+    """hash_password() for each password, in order, spread over `workers` threads (default HASH_WORKERS)."""
+    workers = min(len(passwords), workers or HASH_WORKERS)
+    if workers <= 1:
+        return [hash_password(password) for password in passwords]
+    with ThreadPoolExecutor(workers, thread_name_prefix="hash") as pool:
+        return list(pool.map(hash_password, passwords))
+
+def is_hashed(stored) -> bool:
+    return isinstance(stored, str) and stored.startswith(ALGORITHM + "$")
+
+def needs_rehash(stored) -> bool:
+    """Plaintext, or hashed with fewer iterations than the current setting."""
+    if not is_hashed(stored):
+        return True
+    try:
+        return int(stored.split("$")[1]) < PASSWORD_ITERATIONS
+    except (IndexError, ValueError):
+        return True
+
+def verify_password(password: str, stored) -> bool:
+    if stored is None:
+        return False
+    if not is_hashed(stored):
+        # legacy plaintext entry (see the hash-passwords command)
+        return hmac.compare_digest(str(password).encode("utf-8"), str(stored).encode("utf-8"))
+    try:
+        _, iterations, salt, expected = stored.split("$")
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), _unb64(salt), int(iterations))
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(digest, _unb64(expected))
@@ -0,0 +1,154 @@
+# utils/payroll_aggregates.py
+"""
+Materialized payroll totals for the admin dashboard.
+- PayrollAggregates: gross pay per role plus PF / tax / loan debit sums,
+  kept up to date incrementally from EmployeeStore put/remove events
+- aggregates_for(data): the shared instance for a document; rebuilt when
+  the store is rebuilt or a role's hourly_rate changes
+- check_drift(): recompute from scratch and report any difference
+"""
+
+import threading
+
+from utils.employee_store import store_for
+from utils.salary_calculator import calculate_for_employee_record, calculate_batch, summarize_batch, sync_pay_cache
+
+def _roles_fingerprint(roles: dict) -> tuple:
+    return tuple((name, role.get("hourly_rate", 300)) for name, role in roles.items())
+
+class PayrollAggregates:
+    def __init__(self, data: dict):
+        self.data = data
+        self.store = store_for(data)
+        self._lock = threading.Lock()
+        self._history_key = None
+        self._history = []
+        self.rebuild()
+        self.store.listeners.append(self._on_change)
+
+    def rebuild(self):
+        """Recompute every total with one vectorized pass over the workforce."""
+        employees = self.data.get("employees", [])
+        roles = self.data.get("roles", {})
+        batch = calculate_batch(employees, roles)
+        with self._lock:
+            self.roles_fingerprint = _roles_fingerprint(roles)
+            self._contrib = {}
+            self.role_gross = {}
+            self.role_count = {}
+            self.total_pf = self.total_tax = self.total_loan = 0
+            for i, emp in enumerate(employees):
+                code = int(emp.get("code", -1))
+                if self.store.get(code) is not emp:
+                    continue  # shadowed duplicate code
+                self._add(code, (emp.get("role"), int(batch["grosspay"][i]), int(batch["pf"][i]),
+                                 int(batch["tax"][i]), int(batch["loan_debit"][i])))
+
+    # ---------------------- incremental upkeep ----------------------
+    def _add(self, code: int, contrib: tuple):
+        role, gross, pf, tax, loan = contrib
+        self._contrib[code] = contrib
+        self.role_gross[role] = self.role_gross.get(role, 0) + gross
+        self.role_count[role] = self.role_count.get(role, 0) + 1
+        self.total_pf += pf
+        self.total_tax += tax
+        self.total_loan += loan
+
+    def _subtract(self, code: int):
+        contrib = self._contrib.pop(code, None)
+        if contrib is None:
+            return
+        role, gross, pf, tax, loan = contrib
+        self.role_gross[role] -= gross
+        self.role_count[role] -= 1
+        if not self.role_count[role]:
+            del self.role_gross[role]
+            del self.role_count[role]
+        self.total_pf -= pf
+        self.total_tax -= tax
+        self.total_loan -= loan
+
+    def _on_change(self, code: int, emp):
+        if code is None:
+            self.rebuild()  # the whole store was re-indexed (bulk update)
+            return
+        contrib = None
+        if emp is not None:
+            breakdown, _ = calculate_for_employee_record(emp, self.data.get("roles", {}))
+            contrib = (emp.get("role"), breakdown["grosspay"], breakdown["pf"],
+                       breakdown["tax"], breakdown["loan_debit"])
+        with self._lock:
+            self._subtract(code)
+            if contrib is not None:
+                self._add(code, contrib)
+
+    def detach(self):
+        if self._on_change in self.store.listeners:
+            self.store.listeners.remove(self._on_change)
+
+    def is_current(self, data: dict) -> bool:
+        return (data is self.data and store_for(data) is self.store
+                and _roles_fingerprint(data.get("roles", {})) == self.roles_fingerprint)
+
+    # ---------------------- reading ----------------------
+    def sorted_history(self) -> list:
+        """payroll_history sorted by month, re-sorted only when the list changes."""
+        history = self.data.get("payroll_history", [])
+        key = (id(history), len(history))
+        if key != self._history_key:
+            self._history = sorted(history, key=lambda x: x["month"])
+            self._history_key = key
+        return self._history
+
+    def charts_data(self) -> dict:
+        """The admin dashboard's chart payload, O(roles + months)."""
+        with self._lock:
+            count = len(self._contrib)
+            history = self.sorted_history()
+            return {
+                "roles": list(self.role_gross.keys()),
+                "roleTotals": list(self.role_gross.values()),
+                "avgPF": round(self.total_pf / count, 2) if count else 0,
+                "avgTax": round(self.total_tax / count, 2) if count else 0,
+                "avgLoan": round(self.total_loan / count, 2) if count else 0,
+                "months": [h["month"] for h in history],
+                "expenses": [h["total_expense"] for h in history],
+                "count": count,
+            }
+
+    def check_drift(self) -> list:
+        """Compare the incremental totals with a full recomputation; returns human-readable differences."""
+        store = self.store
+        employees = [e for e in self.data.get("employees", []) if store.get(e.get("code", -1)) is e]
+        fresh = summarize_batch(employees, calculate_batch(employees, self.data.get("roles", {})))
+        drift = []
+        with self._lock:
+            for role in set(fresh["role_totals"]) | set(self.role_gross):
+                expected = int(fresh["role_totals"].get(role, 0))
+                actual = self.role_gross.get(role, 0)
+                if expected != actual:
+                    drift.append(f"role {role!r}: gross {actual} != {expected}")
+            for name, actual in (("total_pf", self.total_pf), ("total_tax", self.total_tax), ("total_loan", self.total_loan)):
+                if fresh[name] != actual:
+                    drift.append(f"{name}: {actual} != {fresh[name]}")
+            if fresh["count"] != len(self._contrib):
+                drift.append(f"count: {len(self._contrib)} != {fresh['count']}")
+        return drift
+
+
+_aggregates = None
+_aggregates_lock = threading.Lock()
+
+def aggregates_for(data: dict) -> PayrollAggregates:
+    """Return the shared aggregates for this document, rebuilding only when stale."""
+    global _aggregates
+    aggregates = _aggregates
+    if aggregates is None or not aggregates.is_current(data):
+        with _aggregates_lock:
+            if _aggregates is None or not _aggregates.is_current(data):
+                if _aggregates is not None:
+                    _aggregates.detach()
+                sync_pay_cache(data.get("roles", {}))
+                _aggregates = PayrollAggregates(data)
+            aggregates = _aggregates
+    return aggregates
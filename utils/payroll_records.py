@@ -0,0 +1,127 @@
+# utils/payroll_records.py
+"""
+Monthly pay-run records.
+- current_period(): pay period of today as "YYYY-MM"
+- parse_period(period): the period if it is a real "YYYY-MM" month, else ValueError
+- get_payroll_record(data, code, period): the issued record, or None
+- payroll_breakdown(data, emp, period): issued breakdown if there is one,
+  otherwise a read-only preview (nothing is written, loan not debited)
+- issue_payroll_records(data, period): the month-end pay run (see below);
+  also adds the new records to the year-to-date totals (payroll_reports)
+
+Records live in data["payroll_records"][period][str(code)] and are never
+changed after they are issued. Completed runs are kept in
+data["payroll_runs"][period].
+"""
+
+import datetime
+import re
+import threading
+import time
+
+from utils.data_handler import employees_changed, save_data, invalidate_cache, document_lock
+from utils.payroll_reports import update_ytd
+from utils.records import Breakdown
+from utils.salary_calculator import calculate_for_employee_record, calculate_batch, BATCH_COLUMNS
+
+_payrun_lock = threading.Lock()
+
+def current_period() -> str:
+    return datetime.date.today().strftime("%Y-%m")
+
+def parse_period(period) -> str:
+    """Return period if it is a valid pay period "YYYY-MM" (month 01-12); raises ValueError otherwise."""
+    try:
+        if not re.fullmatch(r"\d{4}-\d{2}", period):
+            raise ValueError
+        datetime.datetime.strptime(period, "%Y-%m")
+    except (TypeError, ValueError):
+        raise ValueError(f"pay period must be YYYY-MM, got {period!r}") from None
+    return period
+
+def get_payroll_record(data: dict, code, period: str = None):
+    period = period or current_period()
+    return data.get("payroll_records", {}).get(period, {}).get(str(code))
+
+def payroll_breakdown(data: dict, emp: dict, period: str = None) -> dict:
+    """Breakdown to show for emp: the issued record, else a preview."""
+    record = get_payroll_record(data, emp.get("code"), period)
+    if record is not None:
+        return record["breakdown"]
+    breakdown, _ = calculate_for_employee_record(emp, roles_dict=data.get("roles", {}))
+    return breakdown
+
+def issue_payroll_records(data: dict, period: str = None) -> dict:
+    """
+    Month-end pay run for `period`, as one transaction:
+    compute every employee still missing a record in one calculate_batch
+    pass, store the records, debit each loan once, add them to the YTD
+    totals, append the month's total to payroll_history and mark the run
+    completed, then save once.
+
+    Idempotent: a completed period returns its stored summary untouched.
+    Restartable: nothing is persisted unless the single save succeeds, and
+    a failed save drops the in-memory changes (cache invalidated).
+    Returns the run summary, including wall-clock time and throughput.
+    """
+    period = parse_period(period or current_period())
+    with _payrun_lock:
+        done = data.get("payroll_runs", {}).get(period)
+        if done is not None and done.get("status") == "completed":
+            return dict(done, already_run=True)
+
+        started = time.perf_counter()
+        try:
+            # snapshot, compute and apply under one lock: an edit of the same
+            # employee (e.g. a new loan) lands wholly before or after the run
+            with document_lock:
+                records = data.setdefault("payroll_records", {}).setdefault(period, {})
+                employees = [e for e in data.get("employees", []) if str(e.get("code")) not in records]
+                batch = calculate_batch(employees, data.get("roles", {}))
+                columns = {key: batch[key].tolist() for key in BATCH_COLUMNS}
+                issued_at = datetime.datetime.now().isoformat(timespec="seconds")
+                issued = []
+                for i, emp in enumerate(employees):
+                    breakdown = Breakdown(*[columns[key][i] for key in BATCH_COLUMNS])
+                    record = {
+                        "code": emp.get("code"),
+                        "period": period,
+                        "role": emp.get("role"),
+                        "department": emp.get("department", "General"),
+                        "issued_at": issued_at,
+                        "breakdown": breakdown,
+                    }
+                    records[str(emp.get("code"))] = record
+                    issued.append(record)
+                    emp["loan_balance"] = breakdown["loan_balance_after"]
+                update_ytd(data, period, issued)
+                employees_changed(data, [e.get("code") for e in employees])
+
+                total_expense = sum(r["breakdown"]["grosspay"] for r in records.values())
+                history = [h for h in data.get("payroll_history", []) if h.get("month") != period]
+                history.append({"month": period, "total_expense": total_expense})
+                data["payroll_history"] = history
+
+                summary = {
+                    "period": period,
+                    "status": "completed",
+                    "employees": len(records),
+                    "issued": len(employees),
+                    "total_expense": total_expense,
+                    "completed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "compute_seconds": round(time.perf_counter() - started, 3),
+                }
+                data.setdefault("payroll_runs", {})[period] = summary
+            save_data(data)
+        except BaseException:
+            # the document now holds half-applied changes: throw it away
+            invalidate_cache()
+            raise
+
+        elapsed = time.perf_counter() - started  # wall clock including the save
+        return dict(
+            summary,
+            already_run=False,
+            elapsed_seconds=round(elapsed, 3),
+            employees_per_second=round(len(employees) / elapsed, 1) if elapsed else 0.0,
+        )
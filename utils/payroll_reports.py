@@ -0,0 +1,187 @@
+# utils/payroll_reports.py
+"""
+Year-to-date and statutory reports over the issued payroll records.
+- fiscal_year(period): "2025-26" for any period from 2025-04 to 2026-03
+- update_ytd(data, period, records): fold one pay run's new records into the
+  running accumulators; called by issue_payroll_records() inside the pay-run
+  transaction, so the totals are saved together with the records
+- catch_up_ytd(data): fold periods issued before the accumulators existed,
+  once; run by the pay run (update_ytd) and by the SQLite migration
+- ytd_for(data, fy): the accumulators of a fiscal year (read only)
+- check_ytd(data, fy): compare with a recomputation from the records
+- employee_rows / department_rows / statutory_rows: report rows
+- iter_report_csv(data, fy, by): the report as CSV text chunks
+
+Accumulators live in data["payroll_ytd"][fy]:
+  "revision":    bumped on every change (the SQLite backend writes only then)
+  "periods":     periods already folded in
+  "employees":   code -> [periods paid, grosspay, pf, tax, loan_debit, netpay]
+  "departments": department -> same columns (department at issue time)
+  "months":      period -> [employees paid, grosspay, pf, tax, loan_debit, netpay]
+"""
+
+import csv
+import io
+
+from utils.data_handler import document_lock
+from utils.employee_store import store_for
+
+FISCAL_YEAR_START_MONTH = 4  # April
+YTD_AMOUNTS = ("grosspay", "pf", "tax", "loan_debit", "netpay")
+REPORT_KINDS = ("employee", "department", "statutory")
+REPORT_CHUNK_SIZE = 5000  # CSV rows per yielded chunk
+
+# held while records are added and folded (pay run, migration) and while reports copy totals;
+# the accumulators are part of the shared document, so this is its document_lock
+ytd_lock = document_lock
+
+def fiscal_year(period: str) -> str:
+    """Fiscal year of a "YYYY-MM" period; raises ValueError for anything else (e.g. month 13)."""
+    try:
+        year, month = (int(part) for part in period.split("-"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"pay period must be YYYY-MM, got {period!r}") from None
+    if not 1 <= month <= 12:
+        raise ValueError(f"pay period must be YYYY-MM, got {period!r}")
+    start = year if month >= FISCAL_YEAR_START_MONTH else year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+def fiscal_periods(fy: str) -> list:
+    start = int(fy.split("-")[0])
+    periods = []
+    for i in range(12):
+        month = (FISCAL_YEAR_START_MONTH - 1 + i) % 12 + 1
+        year = start if month >= FISCAL_YEAR_START_MONTH else start + 1
+        periods.append(f"{year}-{month:02d}")
+    return periods
+
+def _empty_ytd() -> dict:
+    return {"revision": 0, "periods": [], "employees": {}, "departments": {}, "months": {}}
+
+def _add(totals: dict, key, amounts: list):
+    row = totals.get(key)
+    if row is None:
+        totals[key] = [1] + amounts
+    else:
+        row[0] += 1
+        for i, value in enumerate(amounts, 1):
+            row[i] += value
+
+def update_ytd(data: dict, period: str, records) -> dict:
+    """
+    Add these newly issued records of `period` to its fiscal year's
+    accumulators. The first time a period is seen, every issued record of
+    it is folded in (earlier ones included), after any other period issued
+    before the accumulators existed (catch_up_ytd).
+    """
+    with ytd_lock:
+        ytd = data.get("payroll_ytd", {}).get(fiscal_year(period))
+        if ytd is not None and period in ytd["periods"]:
+            return _fold(data, period, records)
+        catch_up_ytd(data)  # folds the whole period, these records included
+        return data["payroll_ytd"][fiscal_year(period)]
+
+def catch_up_ytd(data: dict) -> list:
+    """
+    Fold every issued period missing from its fiscal year's accumulators,
+    whole and once; returns those periods. Only called inside a transaction
+    that saves (pay run, migration), never on a report's read path.
+    """
+    with ytd_lock:
+        folded = []
+        for period, records in sorted(data.get("payroll_records", {}).items()):
+            ytd = data.get("payroll_ytd", {}).get(fiscal_year(period))
+            if records and (ytd is None or period not in ytd["periods"]):
+                _fold(data, period, records.values())
+                folded.append(period)
+        return folded
+
+def _fold(data: dict, period: str, records) -> dict:
+    fy = fiscal_year(period)
+    ytd = data.setdefault("payroll_ytd", {}).setdefault(fy, _empty_ytd())
+    employees, departments = ytd["employees"], ytd["departments"]
+    month = ytd["months"].setdefault(period, [0] + [0] * len(YTD_AMOUNTS))
+    for record in records:
+        breakdown = record["breakdown"]
+        amounts = [breakdown[key] for key in YTD_AMOUNTS]
+        _add(employees, str(record["code"]), amounts)
+        _add(departments, record.get("department") or "General", amounts)
+        month[0] += 1
+        for i, value in enumerate(amounts, 1):
+            month[i] += value
+    if period not in ytd["periods"]:
+        ytd["periods"].append(period)
+        ytd["periods"].sort()
+    ytd["revision"] = ytd.get("revision", 0) + 1
+    return ytd
+
+def ytd_for(data: dict, fy: str) -> dict:
+    """Accumulators for fiscal year `fy` (read only: empty until a pay run or migration created them)."""
+    return data.get("payroll_ytd", {}).get(fy) or _empty_ytd()
+
+def check_ytd(data: dict, fy: str) -> list:
+    """Compare the running totals with a recomputation from the issued records; human-readable differences."""
+    with ytd_lock:
+        running = ytd_for(data, fy)
+        issued = data.get("payroll_records", {})
+        rebuilt = {}
+        for period in fiscal_periods(fy):
+            if issued.get(period):
+                _fold(rebuilt, period, issued[period].values())
+        rebuilt = ytd_for(rebuilt, fy)
+        drift = []
+        for part in ("employees", "departments", "months"):
+            for key in sorted(set(running[part]) | set(rebuilt[part]), key=str):
+                if running[part].get(key) != rebuilt[part].get(key):
+                    drift.append(f"{part} {key}: running {running[part].get(key)} != recomputed {rebuilt[part].get(key)}")
+    return drift
+
+# ---------------------- REPORT ROWS ----------------------
+EMPLOYEE_COLUMNS = ("fiscal_year", "code", "name", "department", "periods") + YTD_AMOUNTS
+DEPARTMENT_COLUMNS = ("fiscal_year", "department", "employee_periods") + YTD_AMOUNTS
+STATUTORY_COLUMNS = ("fiscal_year", "period", "employees") + YTD_AMOUNTS
+
+def _totals(data: dict, fy: str, part: str) -> list:
+    """Copy of one accumulator table, so a pay run committing meanwhile cannot change it under the report."""
+    with ytd_lock:
+        return [(key, list(totals)) for key, totals in ytd_for(data, fy)[part].items()]
+
+def employee_rows(data: dict, fy: str):
+    store = store_for(data)
+    for code, totals in sorted(_totals(data, fy, "employees"), key=lambda kv: int(kv[0])):
+        emp = store.get(int(code))
+        name = emp.get("name") if emp is not None else None
+        department = emp.get("department", "General") if emp is not None else None
+        yield [fy, int(code), name, department] + totals
+
+def department_rows(data: dict, fy: str):
+    for department, totals in sorted(_totals(data, fy, "departments")):
+        yield [fy, department] + totals
+
+def statutory_rows(data: dict, fy: str):
+    """Month by month PF and tax (TDS) withheld, as filed in the monthly returns."""
+    for period, totals in sorted(_totals(data, fy, "months")):
+        yield [fy, period] + totals
+
+_REPORTS = {
+    "employee": (EMPLOYEE_COLUMNS, employee_rows),
+    "department": (DEPARTMENT_COLUMNS, department_rows),
+    "statutory": (STATUTORY_COLUMNS, statutory_rows),
+}
+
+def iter_report_csv(data: dict, fy: str, by: str = "employee"):
+    """Yield the report as CSV text chunks (one per REPORT_CHUNK_SIZE rows)."""
+    if by not in _REPORTS:
+        raise ValueError(f"unknown report {by!r}")
+    columns, rows = _REPORTS[by]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows(data, fy), 1):
+        writer.writerow(row)
+        if count % REPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,76 @@
+# utils/payslip_cache.py
+"""
+Content-addressed cache for payslip PDFs in static/payslips.
+- payslip_key(employee, breakdown, period): hash of everything printed on
+  the payslip (employee code and details, breakdown values, period) and
+  PAYSLIP_TEMPLATE_VERSION
+- cached_payslip_path(...): where Payslip_<code>_<key>.pdf lives (may not exist yet)
+- cached_payslip_pdf(...): serve that file if it exists, otherwise render it once
+- evict_payslips(folder): drop files older than PAYSLIP_CACHE_MAX_AGE, then
+  least recently used ones until under PAYSLIP_CACHE_MAX_BYTES
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from utils.pdf_generator import generate_payslip_pdf, PAYSLIP_TEMPLATE_VERSION
+
+PAYSLIP_FOLDER = os.path.join("static", "payslips")
+PAYSLIP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+PAYSLIP_CACHE_MAX_AGE = 45 * 24 * 3600  # seconds
+
+def payslip_key(employee: dict, breakdown: dict, period: str) -> str:
+    payload = {
+        "template": PAYSLIP_TEMPLATE_VERSION,
+        "period": period,
+        "code": employee["code"],
+        "name": employee["name"],
+        "role": employee["role"],
+        "exp": employee["exp"],
+        "breakdown": dict(breakdown.items()),
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def cached_payslip_path(employee: dict, breakdown: dict, period: str, folder: str = PAYSLIP_FOLDER) -> str:
+    return os.path.join(folder, f"Payslip_{employee['code']}_{payslip_key(employee, breakdown, period)[:20]}.pdf")
+
+def cached_payslip_pdf(employee: dict, breakdown: dict, period: str, folder: str = PAYSLIP_FOLDER) -> str:
+    """Return the path of this payslip's PDF, rendering it only if the inputs changed."""
+    path = cached_payslip_path(employee, breakdown, period, folder)
+    filename = os.path.basename(path)
+    if os.path.exists(path):
+        os.utime(path)  # mark as recently used for eviction
+        return path
+
+    tmp_name = f".{filename}.{os.getpid()}.tmp"
+    tmp_path = generate_payslip_pdf(employee, breakdown, output_folder=folder, filename=tmp_name)
+    os.replace(tmp_path, path)
+    evict_payslips(folder)
+    return path
+
+def evict_payslips(folder: str = PAYSLIP_FOLDER, max_bytes: int = PAYSLIP_CACHE_MAX_BYTES,
+                   max_age: float = PAYSLIP_CACHE_MAX_AGE) -> int:
+    """Enforce the age and size bounds on cached payslips; returns how many files were removed."""
+    now = time.time()
+    entries = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.startswith("Payslip_") and entry.name.endswith(".pdf"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+    removed = 0
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in sorted(entries):  # oldest / least recently used first
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass  # another worker evicted it first
+        total -= size
+        removed += 1
+    return removed
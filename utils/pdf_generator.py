@@ -1,23 +1,46 @@
 # utils/pdf_generator.py
 """
 Generate a PDF payslip using ReportLab.
+- generate_payslip_pdf(): write the PDF to a file
+- render_payslip_pdf(): same PDF as bytes, rendered into a BytesIO
 """
 
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
 from datetime import date
+import io
 import os
 
-def generate_payslip_pdf(employee: dict, breakdown: dict, output_folder: str = "static/payslips") -> str:
+from utils.instrumentation import timed
+
+# Bump whenever the payslip layout changes so cached PDFs are regenerated
+PAYSLIP_TEMPLATE_VERSION = 1
+
+@timed("payslip_pdf")
+def generate_payslip_pdf(employee: dict, breakdown: dict, output_folder: str = "static/payslips", filename: str = None) -> str:
     """Generate a professional-looking PDF payslip and return file path."""
     if not os.path.exists(output_folder):
         os.makedirs(output_folder, exist_ok=True)
 
-    filename = f"Payslip_{employee['name'].replace(' ', '_')}_{date.today().strftime('%b_%Y')}.pdf"
+    if filename is None:
+        filename = f"Payslip_{employee['name'].replace(' ', '_')}_{date.today().strftime('%b_%Y')}.pdf"
     filepath = os.path.join(output_folder, filename)
 
-    c = canvas.Canvas(filepath, pagesize=A4)
+    _draw_payslip(filepath, employee, breakdown)
+    return filepath
+
+@timed("payslip_pdf")
+def render_payslip_pdf(employee: dict, breakdown: dict) -> bytes:
+    """Render the same payslip into memory and return the PDF bytes (no files written)."""
+    buffer = io.BytesIO()
+    _draw_payslip(buffer, employee, breakdown)
+    return buffer.getvalue()
+
+def _draw_payslip(target, employee: dict, breakdown: dict):
+    """Draw the payslip onto a canvas writing to target (a path or a binary file object)."""
+    # ReportLab is loaded on the first payslip, not when the app starts
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(target, pagesize=A4)
     width, height = A4
     c.setTitle("Payslip")
 
@@ -93,4 +116,3 @@ def generate_payslip_pdf(employee: dict, breakdown: dict, output_folder: str = "
 
     c.showPage()
     c.save()
-    return filepath
@@ -0,0 +1,258 @@
+# utils/records.py
+"""
+Compact in-memory records for the data document.
+- Employee: __slots__ record, usable wherever an employee dict was
+  (emp["name"], emp.get(...), emp.update(...), "key" in emp, dict(emp))
+- Breakdown: __slots__ salary breakdown, compares equal to the
+  plain dict calculate_pay_from_hours() used to return
+- compact_document(data): convert a freshly parsed document in place
+- json_default: pass as json.dump(default=...) to write either back out
+
+Computed pay fields (salary, hra, ... grosspay) are not kept on Employee:
+they are derived from the inputs with calculate_for_employee_record() and
+are dropped from old records on load, so they are never persisted again.
+"""
+
+# Pay figures older versions stored on the employee record itself
+DERIVED_FIELDS = frozenset((
+    "salary", "hra", "da", "pf", "tax", "meal_allowance", "medical_allowance",
+    "transport_allowance", "loan_debit", "grosspay", "netpay", "effective_rate",
+))
+
+EMPLOYEE_FIELDS = (
+    "code", "name", "username", "password", "role", "department",
+    "exp", "working_hours", "loan_balance", "designation", "age",
+)
+_EMPLOYEE_FIELD_SET = frozenset(EMPLOYEE_FIELDS)
+_MISSING = object()
+
+class Employee:
+    """An employee record. Unset fields behave like missing dict keys; unknown keys go to _extra."""
+    __slots__ = EMPLOYEE_FIELDS + ("_extra",)
+
+    def __init__(self, fields=None, **kwargs):
+        self._extra = None
+        if fields:
+            self.update(fields)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def from_dict(cls, record) -> "Employee":
+        """Build from a JSON/dict record, dropping the derived pay fields."""
+        emp = cls()
+        extra = None
+        for key, value in record.items():
+            if key in _EMPLOYEE_FIELD_SET:
+                setattr(emp, key, value)
+            elif key not in DERIVED_FIELDS:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        emp._extra = extra
+        return emp
+
+    def to_dict(self) -> dict:
+        record = {}
+        for field in EMPLOYEE_FIELDS:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                record[field] = value
+        if self._extra:
+            record.update(self._extra)
+        return record
+
+    # ---------------------- mapping protocol ----------------------
+    def __getitem__(self, key):
+        if key in _EMPLOYEE_FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _EMPLOYEE_FIELD_SET:
+            return getattr(self, key, default)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        if key in _EMPLOYEE_FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _EMPLOYEE_FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _EMPLOYEE_FIELD_SET:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def keys(self):
+        return list(self.to_dict())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return list(self.to_dict().items())
+
+    def values(self):
+        return list(self.to_dict().values())
+
+    def update(self, other=(), **kwargs):
+        pairs = other.items() if hasattr(other, "items") else other
+        for key, value in pairs:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def copy(self) -> "Employee":
+        emp = Employee()
+        for field in EMPLOYEE_FIELDS:
+            if hasattr(self, field):
+                setattr(emp, field, getattr(self, field))
+        emp._extra = dict(self._extra) if self._extra else None
+        return emp
+
+    def __eq__(self, other):
+        if isinstance(other, (Employee, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Employee({self.to_dict()!r})"
+
+
+BREAKDOWN_FIELDS = (
+    "hours", "hourly_rate", "effective_rate", "exp_multiplier",
+    "basic", "hra", "da", "pf", "tax",
+    "meal_allowance", "medical_allowance", "transport_allowance",
+    "loan_debit", "loan_balance_after", "grosspay", "netpay",
+)
+_BREAKDOWN_FIELD_SET = frozenset(BREAKDOWN_FIELDS)
+
+class Breakdown:
+    """One salary breakdown, read like the breakdown dict (b["grosspay"], b.get(...), dict(b))."""
+    __slots__ = BREAKDOWN_FIELDS
+
+    def __init__(self, hours, hourly_rate, effective_rate, exp_multiplier, basic, hra, da, pf, tax,
+                 meal_allowance, medical_allowance, transport_allowance,
+                 loan_debit, loan_balance_after, grosspay, netpay):
+        self.hours = hours
+        self.hourly_rate = hourly_rate
+        self.effective_rate = effective_rate
+        self.exp_multiplier = exp_multiplier
+        self.basic = basic
+        self.hra = hra
+        self.da = da
+        self.pf = pf
+        self.tax = tax
+        self.meal_allowance = meal_allowance
+        self.medical_allowance = medical_allowance
+        self.transport_allowance = transport_allowance
+        self.loan_debit = loan_debit
+        self.loan_balance_after = loan_balance_after
+        self.grosspay = grosspay
+        self.netpay = netpay
+
+    @classmethod
+    def from_dict(cls, record) -> "Breakdown":
+        return cls(*[record[key] for key in BREAKDOWN_FIELDS])
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in BREAKDOWN_FIELDS}
+
+    def __getitem__(self, key):
+        if key in _BREAKDOWN_FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in _BREAKDOWN_FIELD_SET else default
+
+    def __contains__(self, key):
+        return key in _BREAKDOWN_FIELD_SET
+
+    def keys(self):
+        return list(BREAKDOWN_FIELDS)
+
+    def __iter__(self):
+        return iter(BREAKDOWN_FIELDS)
+
+    def __len__(self):
+        return len(BREAKDOWN_FIELDS)
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in BREAKDOWN_FIELDS]
+
+    def values(self):
+        return [getattr(self, key) for key in BREAKDOWN_FIELDS]
+
+    def __eq__(self, other):
+        if isinstance(other, (Breakdown, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Breakdown({self.to_dict()!r})"
+
+# ---------------------- DOCUMENT CONVERSION ----------------------
+def compact_record(record: dict) -> dict:
+    """A payroll record with its breakdown as a Breakdown."""
+    breakdown = record.get("breakdown")
+    if isinstance(breakdown, dict):
+        record["breakdown"] = Breakdown.from_dict(breakdown)
+    return record
+
+def compact_document(data: dict) -> dict:
+    """Convert a parsed document in place: employees to Employee, issued breakdowns to Breakdown."""
+    data["employees"] = [Employee.from_dict(e) for e in data.get("employees", [])]
+    for records in data.get("payroll_records", {}).values():
+        for record in records.values():
+            compact_record(record)
+    return data
+
+def json_default(obj):
+    """json.dump(default=...) hook for Employee / Breakdown."""
+    if isinstance(obj, (Employee, Breakdown)):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
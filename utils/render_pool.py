@@ -0,0 +1,67 @@
+# utils/render_pool.py
+"""
+Optional process pool for request-time payslip PDFs.
+- render_payslip(employee, breakdown): PDF bytes, rendered in a worker
+  process when PAYROLL_RENDER_PROCESSES > 0 (ReportLab holds the GIL, so
+  threads alone do not render in parallel), else in the calling thread
+- RenderBusy: raised instead of queueing when RENDER_QUEUE_LIMIT renders
+  are already waiting, so a burst of downloads gets a quick 503
+- render_pool_stats(): in-flight renders, reported on /metrics
+
+Workers are started with forkserver (spawn where unavailable): the web
+process has running threads by the time the pool is first used.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.instrumentation import span, register_gauges
+from utils.pdf_generator import render_payslip_pdf
+
+RENDER_PROCESSES = int(os.environ.get("PAYROLL_RENDER_PROCESSES", "0"))
+RENDER_QUEUE_LIMIT = int(os.environ.get("PAYROLL_RENDER_QUEUE", "16"))
+
+class RenderBusy(Exception):
+    """More payslip renders are in flight than RENDER_QUEUE_LIMIT."""
+
+_pool = {"pid": None, "executor": None}
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(RENDER_QUEUE_LIMIT)
+_in_flight = {"count": 0}
+_in_flight_lock = threading.Lock()
+
+def _executor() -> ProcessPoolExecutor:
+    with _pool_lock:
+        if _pool["pid"] != os.getpid():
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool.update(pid=os.getpid(), executor=ProcessPoolExecutor(RENDER_PROCESSES, mp_context=context))
+        return _pool["executor"]
+
+def render_payslip(employee, breakdown) -> bytes:
+    if RENDER_PROCESSES <= 0:
+        return render_payslip_pdf(employee, breakdown)
+    if not _slots.acquire(blocking=False):
+        raise RenderBusy()
+    with _in_flight_lock:
+        _in_flight["count"] += 1
+    try:
+        with span("payslip_pdf_process"):
+            return _executor().submit(render_payslip_pdf, employee, breakdown).result()
+    finally:
+        with _in_flight_lock:
+            _in_flight["count"] -= 1
+        _slots.release()
+
+def render_pool_stats() -> dict:
+    return {"processes": max(RENDER_PROCESSES, 0), "in_flight": _in_flight["count"], "limit": RENDER_QUEUE_LIMIT}
+
+register_gauges("payroll_render_pool", render_pool_stats)
+
+def shutdown_render_pool():
+    with _pool_lock:
+        if _pool["executor"] is not None and _pool["pid"] == os.getpid():
+            _pool["executor"].shutdown(wait=False, cancel_futures=True)
+        _pool.update(pid=None, executor=None)
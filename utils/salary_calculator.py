@@ -4,8 +4,18 @@ Enhanced Salary Calculator
 - Includes role-based rate (from roles.json)
 - Adds experience-based increment scaling
 - Mirrors C++ logic for allowances/deductions
+- calculate_batch(): same breakdown for a whole employee list as NumPy columns
+- calculate_pay_from_hours() is memoized on (hours, rate, experience band);
+  see pay_cache_stats() / sync_pay_cache()
 """
 
+from functools import lru_cache
+
+# numpy is imported inside the batch functions: most requests never need it
+
+from utils.instrumentation import timed
+from utils.records import Breakdown, BREAKDOWN_FIELDS
+
 # Base constants (from your C++ code)
 TAX_RATE = 0.04
 DA_RATE = 1.20
@@ -16,41 +26,93 @@ MEAL_ALLOWANCE = 300
 MEDICAL_ALLOWANCE = 300
 TRANSPORT_ALLOWANCE = 300
 
+# Experience increment: (up to this many years, factor), then the top factor
+EXPERIENCE_BANDS = (
+    (1, 1.00),   # no increment
+    (3, 1.05),   # +5%
+    (5, 1.10),   # +10%
+    (7, 1.15),   # +15%
+)
+EXPERIENCE_TOP_MULTIPLIER = 1.20  # +20%
+
 def experience_multiplier(exp: int) -> float:
     """Return salary increment factor based on years of experience."""
-    if exp <= 1:
-        return 1.00   # no increment
-    elif exp <= 3:
-        return 1.05   # +5%
-    elif exp <= 5:
-        return 1.10   # +10%
-    elif exp <= 7:
-        return 1.15   # +15%
-    else:
-        return 1.20   # +20%
+    for max_years, factor in EXPERIENCE_BANDS:
+        if exp <= max_years:
+            return factor
+    return EXPERIENCE_TOP_MULTIPLIER
 
-def calculate_pay_from_hours(hours: int, loan_balance: int = 0, hourly_rate: float = 300.0, exp: int = 0):
+# The rates above as one overridable parameter set (see utils/simulation.py)
+DEFAULT_POLICY = {
+    "tax_rate": TAX_RATE,
+    "da_rate": DA_RATE,
+    "pf_rate": PF_RATE,
+    "hra_rate": HRA_RATE,
+    "loan_debit_rate": LOAN_DEBIT_RATE,
+    "meal_allowance": MEAL_ALLOWANCE,
+    "medical_allowance": MEDICAL_ALLOWANCE,
+    "transport_allowance": TRANSPORT_ALLOWANCE,
+    "experience_bands": EXPERIENCE_BANDS,
+    "experience_top_multiplier": EXPERIENCE_TOP_MULTIPLIER,
+}
+
+PAY_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=PAY_CACHE_SIZE)
+def _pay_core(hours, hourly_rate, multiplier) -> tuple:
     """
-    Calculate salary breakdown given monthly hours, role rate, experience, and loan balance.
-    Returns breakdown dictionary with gross and net pay.
+    The loan-independent part of the breakdown. Experience only enters
+    through its band multiplier, so employees with the same hours, rate and
+    band share one entry.
     """
-    # Apply experience-based multiplier
-    rate_with_exp = hourly_rate * experience_multiplier(exp)
-
-    # Base pay
+    rate_with_exp = hourly_rate * multiplier
     basic = int(hours * rate_with_exp)
-
-    # Allowances and deductions (same as your C++ logic)
     tax = int(TAX_RATE * basic)
     da = int(DA_RATE * basic)
     pf = int(PF_RATE * basic)
     hra = int(HRA_RATE * basic)
+    loan_debit = int(LOAN_DEBIT_RATE * basic)  # before capping at the balance
+    return int(rate_with_exp), basic, tax, da, pf, hra, loan_debit
+
+def pay_cache_stats() -> dict:
+    """Hit/miss counters of the calculate_pay_from_hours() memo."""
+    info = _pay_core.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+    }
+
+_pay_cache_rates = None
+
+def invalidate_pay_cache():
+    _pay_core.cache_clear()
+
+def sync_pay_cache(roles_dict: dict):
+    """Drop memoized results once the role rates change (old rates would only waste slots)."""
+    global _pay_cache_rates
+    rates = tuple(sorted((name, role.get("hourly_rate", 300)) for name, role in (roles_dict or {}).items()))
+    if rates != _pay_cache_rates:
+        if _pay_cache_rates is not None:
+            invalidate_pay_cache()
+        _pay_cache_rates = rates
+
+def calculate_pay_from_hours(hours: int, loan_balance: int = 0, hourly_rate: float = 300.0, exp: int = 0):
+    """
+    Calculate salary breakdown given monthly hours, role rate, experience, and loan balance.
+    Returns a Breakdown (reads like the breakdown dict) with gross and net pay.
+    """
+    # Apply experience-based multiplier
+    multiplier = experience_multiplier(exp)
+    effective_rate, basic, tax, da, pf, hra, loan_debit = _pay_core(hours, hourly_rate, multiplier)
 
     meal = MEAL_ALLOWANCE
     medical = MEDICAL_ALLOWANCE
     transport = TRANSPORT_ALLOWANCE
 
-    loan_debit = int(LOAN_DEBIT_RATE * basic)
     if loan_debit > loan_balance:
         loan_debit = loan_balance
     loan_balance_after = int(loan_balance - loan_debit)
@@ -58,25 +120,26 @@ def calculate_pay_from_hours(hours: int, loan_balance: int = 0, hourly_rate: flo
     grosspay = int((basic + meal + medical + transport + hra + da) - (pf + tax + loan_debit))
     netpay = grosspay
 
-    return {
-        "hours": int(hours),
-        "hourly_rate": int(hourly_rate),
-        "effective_rate": int(rate_with_exp),
-        "exp_multiplier": round(experience_multiplier(exp), 2),
-        "basic": basic,
-        "hra": hra,
-        "da": da,
-        "pf": pf,
-        "tax": tax,
-        "meal_allowance": meal,
-        "medical_allowance": medical,
-        "transport_allowance": transport,
-        "loan_debit": loan_debit,
-        "loan_balance_after": loan_balance_after,
-        "grosspay": grosspay,
-        "netpay": netpay
-    }
+    return Breakdown(
+        hours=int(hours),
+        hourly_rate=int(hourly_rate),
+        effective_rate=effective_rate,
+        exp_multiplier=round(multiplier, 2),
+        basic=basic,
+        hra=hra,
+        da=da,
+        pf=pf,
+        tax=tax,
+        meal_allowance=meal,
+        medical_allowance=medical,
+        transport_allowance=transport,
+        loan_debit=loan_debit,
+        loan_balance_after=loan_balance_after,
+        grosspay=grosspay,
+        netpay=netpay
+    )
 
+@timed("calculate_pay")
 def calculate_for_employee_record(emp_record: dict, roles_dict: dict = None):
     """Calculate and update salary for an employee record (role + experience aware)."""
     role = emp_record.get("role", "")
@@ -96,19 +159,128 @@ def calculate_for_employee_record(emp_record: dict, roles_dict: dict = None):
         exp=exp
     )
 
+    # pay figures live in the breakdown only; the record just carries the new loan balance
     updated = emp_record.copy()
-    updated.update({
-        "salary": breakdown["basic"],
-        "hra": breakdown["hra"],
-        "da": breakdown["da"],
-        "pf": breakdown["pf"],
-        "tax": breakdown["tax"],
-        "meal_allowance": breakdown["meal_allowance"],
-        "medical_allowance": breakdown["medical_allowance"],
-        "transport_allowance": breakdown["transport_allowance"],
-        "loan_debit": breakdown["loan_debit"],
-        "loan_balance": breakdown["loan_balance_after"],
-        "grosspay": breakdown["grosspay"],
-        "effective_rate": breakdown["effective_rate"]
-    })
+    updated["loan_balance"] = breakdown["loan_balance_after"]
     return breakdown, updated
+
+
+# Columns produced by calculate_batch(), same names as the scalar breakdown
+BATCH_COLUMNS = BREAKDOWN_FIELDS
+
+def experience_multiplier_array(exp: "np.ndarray", bands=EXPERIENCE_BANDS,
+                                top: float = EXPERIENCE_TOP_MULTIPLIER) -> "np.ndarray":
+    """Vectorized experience_multiplier(); same bands, same float factors."""
+    import numpy as np
+
+    return np.select(
+        [exp <= max_years for max_years, _ in bands],
+        [factor for _, factor in bands],
+        default=top,
+    )
+
+def employee_input_columns(employees: list, roles_dict: dict = None) -> dict:
+    """
+    Extract the pay inputs of every employee into NumPy columns.
+    Uses the same int()/float() coercions and 300 fallback rate as
+    calculate_for_employee_record().
+    """
+    import numpy as np
+
+    rates = {}
+    for name, role in (roles_dict or {}).items():
+        rates[name] = float(role.get("hourly_rate", 300))
+
+    n = len(employees)
+    return {
+        "exp": np.fromiter((int(e.get("exp", 0)) for e in employees), dtype=np.int64, count=n),
+        "hours": np.fromiter((int(e.get("working_hours", 0)) for e in employees), dtype=np.int64, count=n),
+        "loan_balance": np.fromiter((int(e.get("loan_balance", 0)) for e in employees), dtype=np.int64, count=n),
+        "hourly_rate": np.fromiter((rates.get(e.get("role", ""), 300.0) for e in employees), dtype=np.float64, count=n),
+    }
+
+def calculate_batch_from_columns(exp, hours, loan_balance, hourly_rate, policy: dict = None) -> dict:
+    """
+    Vectorized calculate_pay_from_hours() over input columns.
+    Every int() in the scalar version is an np.trunc here, applied to the
+    same float64 products in the same order, so results match exactly.
+    `policy` overrides entries of DEFAULT_POLICY (what-if simulations only).
+    """
+    import numpy as np
+
+    p = DEFAULT_POLICY if not policy else {**DEFAULT_POLICY, **policy}
+    multiplier = experience_multiplier_array(exp, p["experience_bands"], p["experience_top_multiplier"])
+    rate_with_exp = hourly_rate * multiplier
+
+    basic = np.trunc(hours * rate_with_exp).astype(np.int64)
+    basic_f = basic.astype(np.float64)
+
+    tax = np.trunc(p["tax_rate"] * basic_f).astype(np.int64)
+    da = np.trunc(p["da_rate"] * basic_f).astype(np.int64)
+    pf = np.trunc(p["pf_rate"] * basic_f).astype(np.int64)
+    hra = np.trunc(p["hra_rate"] * basic_f).astype(np.int64)
+
+    n = len(basic)
+    meal = np.full(n, p["meal_allowance"], dtype=np.int64)
+    medical = np.full(n, p["medical_allowance"], dtype=np.int64)
+    transport = np.full(n, p["transport_allowance"], dtype=np.int64)
+
+    loan_debit = np.minimum(np.trunc(p["loan_debit_rate"] * basic_f).astype(np.int64), loan_balance)
+    loan_balance_after = loan_balance - loan_debit
+
+    grosspay = (basic + meal + medical + transport + hra + da) - (pf + tax + loan_debit)
+
+    return {
+        "hours": hours,
+        "hourly_rate": np.trunc(hourly_rate).astype(np.int64),
+        "effective_rate": np.trunc(rate_with_exp).astype(np.int64),
+        "exp_multiplier": np.round(multiplier, 2),
+        "basic": basic,
+        "hra": hra,
+        "da": da,
+        "pf": pf,
+        "tax": tax,
+        "meal_allowance": meal,
+        "medical_allowance": medical,
+        "transport_allowance": transport,
+        "loan_debit": loan_debit,
+        "loan_balance_after": loan_balance_after,
+        "grosspay": grosspay,
+        "netpay": grosspay.copy(),
+    }
+
+@timed("calculate_batch")
+def calculate_batch(employees: list, roles_dict: dict = None) -> dict:
+    """
+    Calculate the salary breakdown of every employee at once.
+    Returns a dict of NumPy arrays keyed like the scalar breakdown (see
+    BATCH_COLUMNS); row i belongs to employees[i].
+    """
+    cols = employee_input_columns(employees, roles_dict)
+    return calculate_batch_from_columns(cols["exp"], cols["hours"], cols["loan_balance"], cols["hourly_rate"])
+
+def batch_breakdown(batch: dict, i: int) -> Breakdown:
+    """Return row i of a calculate_batch() result as a Breakdown."""
+    row = [batch[key][i].item() for key in BATCH_COLUMNS]
+    return Breakdown(*row)
+
+def summarize_batch(employees: list, batch: dict) -> dict:
+    """
+    Dashboard/chart totals from a calculate_batch() result: gross pay per
+    role (first-seen role order) and the PF, tax and loan debit sums.
+    """
+    import numpy as np
+
+    role_index = {}
+    codes = np.fromiter(
+        (role_index.setdefault(e["role"], len(role_index)) for e in employees),
+        dtype=np.int64, count=len(employees),
+    )
+    gross_by_role = np.bincount(codes, weights=batch["grosspay"], minlength=len(role_index))
+    return {
+        "role_totals": dict(zip(role_index.keys(), gross_by_role.tolist())),
+        "total_pf": int(batch["pf"].sum()),
+        "total_tax": int(batch["tax"].sum()),
+        "total_loan": int(batch["loan_debit"].sum()),
+        "count": len(employees),
+    }
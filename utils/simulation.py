@@ -0,0 +1,187 @@
+# utils/simulation.py
+"""
+What-if simulation of pay policy and role rate changes.
+- scenario: {"name": ..., "policy": {...}, "role_rates": {...}, "role_rate_pct": {...}}
+    policy:        overrides of salary_calculator.DEFAULT_POLICY, e.g.
+                   {"pf_rate": 0.10, "experience_bands": [[2, 1.0], [5, 1.08]],
+                    "experience_top_multiplier": 1.25}
+    role_rates:    {"Software Engineer": 350}  new hourly_rate per role
+    role_rate_pct: {"Software Engineer": 8}    hourly_rate change in percent
+                   ("*" applies to every role)
+- simulate(data, scenarios, workers): every scenario is one vectorized
+  calculate_batch pass over the same input columns, in this process; only
+  very large simulations (employees x scenarios above
+  SIMULATION_PARALLEL_MIN_WORK) fan out to a process pool
+- returns per-role and total baseline / scenario / delta for each metric
+
+Nothing is written: the inputs are read once from the document into NumPy
+columns and the roles are only overridden in the copy sent to the workers.
+"""
+
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.salary_calculator import DEFAULT_POLICY, employee_input_columns, calculate_batch_from_columns
+
+SCENARIO_KEYS = ("name", "policy", "role_rates", "role_rate_pct")
+MAX_SCENARIOS = 64
+SIMULATION_WORKERS = int(os.environ.get("PAYROLL_SIMULATION_WORKERS", str(os.cpu_count() or 1)))
+# One scenario over 100k employees takes ~20 ms in process, starting a pool ~0.2 s:
+# below ~1 s of serial work (employees x scenarios) the pool only adds latency
+SIMULATION_PARALLEL_MIN_WORK = int(os.environ.get("PAYROLL_SIMULATION_PARALLEL_MIN", "5000000"))
+
+# monthly totals compared per role; "cost" is what the company pays out before deductions
+METRICS = ("cost", "basic", "pf", "tax", "loan_debit", "netpay")
+
+def _number(value, what: str, minimum: float = 0.0) -> float:
+    """float(value), rejecting non-numbers, nan / inf and values below minimum (raises ValueError)."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{what} must be a number") from None
+    if not math.isfinite(number):
+        raise ValueError(f"{what} must be a finite number")
+    if number < minimum:
+        raise ValueError(f"{what} must not be less than {minimum:g}")
+    return number
+
+def validate_scenario(scenario: dict, roles: dict) -> dict:
+    """Check a scenario's keys and values; returns it with defaults filled in (raises ValueError)."""
+    if not isinstance(scenario, dict):
+        raise ValueError("a scenario must be an object")
+    unknown = set(scenario) - set(SCENARIO_KEYS)
+    if unknown:
+        raise ValueError(f"unknown scenario keys: {', '.join(sorted(unknown))}")
+    policy = dict(scenario.get("policy") or {})
+    unknown = set(policy) - set(DEFAULT_POLICY)
+    if unknown:
+        raise ValueError(f"unknown policy keys: {', '.join(sorted(unknown))}")
+    for key, value in policy.items():
+        if key == "experience_bands":
+            if not isinstance(value, (list, tuple)) or any(not isinstance(band, (list, tuple)) or len(band) != 2
+                                                           for band in value):
+                raise ValueError("experience_bands must be a list of [years, factor] pairs")
+            bands = [(_number(max_years, "experience_bands years", -math.inf), _number(factor, "experience_bands factor"))
+                     for max_years, factor in value]
+            if [b[0] for b in bands] != sorted(b[0] for b in bands):
+                raise ValueError("experience_bands must be in increasing order of years")
+            policy[key] = tuple(bands)
+        else:
+            policy[key] = _number(value, key)
+    rates = {}
+    for field, minimum in (("role_rates", 0.0), ("role_rate_pct", -100.0)):
+        rates[field] = {}
+        for role, value in (scenario.get(field) or {}).items():
+            if role != "*" and role not in roles:
+                raise ValueError(f"{field}: unknown role {role!r}")
+            rates[field][role] = _number(value, f"{field} for {role}", minimum)
+    return {
+        "name": str(scenario.get("name") or "scenario"),
+        "policy": policy,
+        "role_rates": rates["role_rates"],
+        "role_rate_pct": rates["role_rate_pct"],
+    }
+
+def _scenario_rates(base_rates: dict, scenario: dict) -> dict:
+    rates = dict(base_rates)
+    for role, rate in scenario["role_rates"].items():
+        rates[role] = rate
+    pct = scenario["role_rate_pct"]
+    for role in rates:
+        change = pct.get(role, pct.get("*"))
+        if change is not None:
+            rates[role] = rates[role] * (1 + change / 100)
+    return rates
+
+# ---------------------- VECTORIZED PASS ----------------------
+_inputs = {}  # set once per worker process (and in-process)
+
+def _init_inputs(columns: dict, role_codes, role_names: list, base_rates: dict):
+    _inputs.update(columns=columns, role_codes=role_codes, role_names=role_names, base_rates=base_rates)
+
+def _totals(policy: dict, rates: dict) -> dict:
+    """{metric: per-role sums list} for one parameter set over the loaded inputs."""
+    import numpy as np
+
+    columns, codes, names = _inputs["columns"], _inputs["role_codes"], _inputs["role_names"]
+    # one rate per role name; employees of roles missing from roles use the 300 fallback
+    rate_by_code = np.array([rates.get(name, 300.0) for name in names], dtype=np.float64)
+    hourly_rate = rate_by_code[codes] if len(codes) else np.zeros(0)
+    batch = calculate_batch_from_columns(columns["exp"], columns["hours"], columns["loan_balance"],
+                                         hourly_rate, policy)
+    cost = (batch["basic"] + batch["hra"] + batch["da"] + batch["meal_allowance"]
+            + batch["medical_allowance"] + batch["transport_allowance"])
+    values = {"cost": cost, "basic": batch["basic"], "pf": batch["pf"], "tax": batch["tax"],
+              "loan_debit": batch["loan_debit"], "netpay": batch["netpay"]}
+    return {metric: np.bincount(codes, weights=values[metric], minlength=len(names)).tolist()
+            for metric in METRICS}
+
+def _run_scenario(scenario: dict) -> dict:
+    started = time.perf_counter()
+    totals = _totals(scenario["policy"], _scenario_rates(_inputs["base_rates"], scenario))
+    return {"totals": totals, "seconds": time.perf_counter() - started}
+
+def _compare(baseline: dict, result: dict, role_names: list) -> dict:
+    def entry(before, after):
+        before, after = int(round(before)), int(round(after))
+        return {"baseline": before, "scenario": after, "delta": after - before,
+                "delta_pct": round((after - before) * 100 / before, 3) if before else None}
+
+    return {
+        "total": {metric: entry(sum(baseline[metric]), sum(result[metric])) for metric in METRICS},
+        "roles": {name: {metric: entry(baseline[metric][i], result[metric][i]) for metric in METRICS}
+                  for i, name in enumerate(role_names)},
+    }
+
+def simulate(data: dict, scenarios: list, workers: int = None) -> dict:
+    """
+    Evaluate every scenario against the current workforce (read only).
+    workers: processes for the scenarios, capped at the number of scenarios
+    (1 runs them in this process). Default: in this process, or
+    SIMULATION_WORKERS when employees x scenarios >= SIMULATION_PARALLEL_MIN_WORK.
+    """
+    import numpy as np
+
+    if not scenarios:
+        raise ValueError("give at least one scenario")
+    if len(scenarios) > MAX_SCENARIOS:
+        raise ValueError(f"at most {MAX_SCENARIOS} scenarios per simulation")
+    roles = data.get("roles", {})
+    scenarios = [validate_scenario(s, roles) for s in scenarios]
+
+    started = time.perf_counter()
+    employees = data.get("employees", [])
+    columns = employee_input_columns(employees)
+    columns.pop("hourly_rate")  # re-derived per scenario from the role rates
+    role_index = {}
+    role_codes = np.fromiter((role_index.setdefault(e.get("role", ""), len(role_index)) for e in employees),
+                             dtype=np.int64, count=len(employees))
+    role_names = list(role_index)
+    base_rates = {name: float(role.get("hourly_rate", 300)) for name, role in roles.items()}
+    init_args = (columns, role_codes, role_names, base_rates)
+
+    _init_inputs(*init_args)
+    baseline = _totals({}, base_rates)
+    if workers is None:
+        workers = SIMULATION_WORKERS if len(employees) * len(scenarios) >= SIMULATION_PARALLEL_MIN_WORK else 1
+    workers = min(len(scenarios), workers)
+    if workers <= 1:
+        results = [_run_scenario(s) for s in scenarios]
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_inputs,
+                                 initargs=init_args) as pool:
+            results = list(pool.map(_run_scenario, scenarios))
+
+    return {
+        "employees": len(employees),
+        "workers": workers,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "scenarios": [dict(name=scenario["name"], seconds=round(result["seconds"], 4),
+                           **_compare(baseline, result["totals"], role_names))
+                      for scenario, result in zip(scenarios, results)],
+    }
@@ -0,0 +1,393 @@
+# utils/sqlite_backend.py
+"""
+SQLite storage for the payroll document (stdlib sqlite3, WAL mode).
+- SQLiteBackend(path).load(): the same dict shape as employees.json
+- SQLiteBackend(path).save(data): writes only the rows that changed
+- migrate_json(json_path, db_path): one-shot import of an employees.json
+
+Every employee, role, history month and login is its own indexed row, so
+updating one employee is a single-row write. Each row also keeps its
+full JSON so unknown fields survive a round trip.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+from utils.data_handler import StaleDataError, document_lock
+from utils.employee_store import store_for
+from utils.payroll_reports import catch_up_ytd
+from utils.records import Employee, compact_document, compact_record, json_default
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS employees (
+    code INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    username TEXT,
+    role TEXT,
+    department TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_employees_username ON employees(username);
+CREATE INDEX IF NOT EXISTS idx_employees_role ON employees(role);
+CREATE INDEX IF NOT EXISTS idx_employees_department ON employees(department);
+CREATE INDEX IF NOT EXISTS idx_employees_position ON employees(position);
+
+CREATE TABLE IF NOT EXISTS roles (
+    name TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS payroll_history (
+    month TEXT PRIMARY KEY,
+    total_expense REAL,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS logins (
+    name TEXT PRIMARY KEY,
+    username TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_logins_username ON logins(username);
+
+-- issued pay-run records, immutable once written
+CREATE TABLE IF NOT EXISTS payroll_records (
+    period TEXT NOT NULL,
+    code INTEGER NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (period, code)
+);
+
+-- running year-to-date totals (see payroll_reports), rewritten only when a pay run changes them
+CREATE TABLE IF NOT EXISTS payroll_ytd (
+    fiscal_year TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL,
+    doc TEXT NOT NULL
+);
+
+-- any other top-level key of the document (including "version")
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Top-level keys that live in their own tables
+TABLE_KEYS = ("employees", "roles", "payroll_history", "logins", "payroll_records", "payroll_ytd")
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), default=json_default)
+
+def connect(path: str) -> sqlite3.Connection:
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class SQLiteBackend:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.RLock()
+        self._data = None
+        self._data_version = None
+        self._snapshot = {}  # (table, key) -> row JSON as last read/written
+        self._dirty = set()  # employee codes touched through the data_handler API
+        self.stats = {"hits": 0, "misses": 0}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # one connection per process; never reuse one inherited across fork()
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = connect(self.path)
+            self._pid = os.getpid()
+            self._data = None
+        return self._conn
+
+    # ---------------------- reading ----------------------
+    def load(self) -> dict:
+        """Return the cached document, re-reading only after another connection committed."""
+        with self._lock:
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._data is not None and data_version == self._data_version:
+                self.stats["hits"] += 1
+                return self._data
+            self.stats["misses"] += 1
+            self._data = self._read_all()
+            self._data_version = data_version
+            self._dirty.clear()
+            return self._data
+
+    def _read_all(self) -> dict:
+        conn = self.conn
+        snapshot = {}
+        data = {}
+        for key, value in conn.execute("SELECT key, value FROM meta"):
+            data[key] = json.loads(value)
+            snapshot[("meta", key)] = value
+
+        data["roles"] = {}
+        for name, doc in conn.execute("SELECT name, doc FROM roles"):
+            data["roles"][name] = json.loads(doc)
+            snapshot[("roles", name)] = doc
+
+        data["employees"] = []
+        for code, doc in conn.execute("SELECT code, doc FROM employees ORDER BY position"):
+            data["employees"].append(Employee.from_dict(json.loads(doc)))
+            snapshot[("employees", code)] = doc
+
+        data["payroll_history"] = []
+        for month, doc in conn.execute("SELECT month, doc FROM payroll_history ORDER BY month"):
+            data["payroll_history"].append(json.loads(doc))
+            snapshot[("payroll_history", month)] = doc
+
+        data["logins"] = {}
+        for name, doc in conn.execute("SELECT name, doc FROM logins"):
+            data["logins"][name] = json.loads(doc)
+            snapshot[("logins", name)] = doc
+
+        data["payroll_records"] = {}
+        for period, code, doc in conn.execute("SELECT period, code, doc FROM payroll_records"):
+            data["payroll_records"].setdefault(period, {})[str(code)] = compact_record(json.loads(doc))
+        for period, records in data["payroll_records"].items():
+            snapshot[("payroll_records", period)] = set(records)
+
+        data["payroll_ytd"] = {}
+        for fy, revision, doc in conn.execute("SELECT fiscal_year, revision, doc FROM payroll_ytd"):
+            data["payroll_ytd"][fy] = json.loads(doc)
+            snapshot[("payroll_ytd", fy)] = revision
+
+        self._snapshot = snapshot
+        return data
+
+    def fetch_employee_by_code(self, code: int) -> Optional[dict]:
+        """Single indexed lookup, without loading the whole document."""
+        with self._lock:
+            row = self.conn.execute("SELECT doc FROM employees WHERE code = ?", (int(code),)).fetchone()
+        return Employee.from_dict(json.loads(row[0])) if row else None
+
+    def fetch_employee_by_username(self, username: str) -> Optional[dict]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT doc FROM employees WHERE username = ? ORDER BY position LIMIT 1", (username,)
+            ).fetchone()
+        return Employee.from_dict(json.loads(row[0])) if row else None
+
+    def fetch_credentials(self, username: str) -> list:
+        """Admin logins and the employee with this username, from the username indexes."""
+        with self._lock:
+            logins = self.conn.execute("SELECT name, doc FROM logins WHERE username = ?", (username,)).fetchall()
+            row = self.conn.execute(
+                "SELECT code, doc FROM employees WHERE username = ? ORDER BY position LIMIT 1", (username,)
+            ).fetchone()
+        credentials = [{"kind": "admin", "name": name, "username": username, "password": json.loads(doc).get("password")}
+                       for name, doc in logins]
+        if row:
+            credentials.append({"kind": "employee", "code": row[0], "username": username,
+                                "password": json.loads(row[1]).get("password")})
+        return credentials
+
+    # ---------------------- writing ----------------------
+    def mark_dirty(self, data: dict, code):
+        """Record that employee `code` of this document changed (or was deleted)."""
+        with self._lock:
+            if data is self._data:
+                self._dirty.add(int(code))
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+
+    def save(self, data: dict):
+        """
+        Persist the document in one transaction. Employees are written only
+        for codes marked dirty (update/add/delete_employee); roles, history,
+        logins and meta rows are diffed against what was last read.
+        The document is read under document_lock, so no thread changes it mid-save.
+        """
+        with document_lock, self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+                on_disk = json.loads(row[0]) if row else 0
+                if on_disk != data.get("version", 0):
+                    raise StaleDataError(f"{self.path} is at version {on_disk}, document was loaded at {data.get('version', 0)}")
+
+                if data is self._data:
+                    codes = self._dirty
+                else:
+                    # not our cached document: write every employee
+                    codes = {int(e.get("code", -1)) for e in data.get("employees", [])}
+                    codes |= {key for table, key in self._snapshot if table == "employees"}
+                self._write_employees(conn, data, codes)
+                self._write_small_tables(conn, data)
+                self._write_payroll_records(conn, data)
+                self._write_payroll_ytd(conn, data)
+
+                version = data.get("version", 0) + 1
+                self._put(conn, "meta", "version", _dumps(version),
+                          "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", ("version", _dumps(version)))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                self._data = None
+                raise
+            data["version"] = version
+            self._data = data
+            self._dirty = set()
+            self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _put(self, conn, table, key, doc, sql, params):
+        if self._snapshot.get((table, key)) != doc:
+            conn.execute(sql, params)
+            self._snapshot[(table, key)] = doc
+
+    def _write_employees(self, conn, data: dict, codes: set):
+        if not codes:
+            return
+        store = store_for(data)
+        # positions only order the rows: an existing row keeps its own (list indexes shift
+        # after a delete, and the rows behind it are not rewritten), new rows go after the last
+        position = conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM employees").fetchone()[0]
+        for code in sorted(codes, key=lambda c: (store.position_of(c) is None, store.position_of(c) or 0, c)):
+            emp = store.get(code)
+            if emp is not None:
+                doc = _dumps(emp)
+                conn.execute(
+                    "INSERT INTO employees (code, position, username, role, department, doc) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(code) DO UPDATE SET username = excluded.username, role = excluded.role, "
+                    "department = excluded.department, doc = excluded.doc",
+                    (code, position, emp.get("username"), emp.get("role"), emp.get("department"), doc),
+                )
+                position += 1
+                self._snapshot[("employees", code)] = doc
+            else:
+                conn.execute("DELETE FROM employees WHERE code = ?", (code,))
+                self._snapshot.pop(("employees", code), None)
+
+    def _write_payroll_records(self, conn, data: dict):
+        # records are immutable, so only periods whose size changed have new rows
+        for period, records in data.get("payroll_records", {}).items():
+            known = self._snapshot.setdefault(("payroll_records", period), set())
+            if len(known) == len(records):
+                continue
+            new_keys = [key for key in records if key not in known]
+            conn.executemany(
+                "INSERT OR IGNORE INTO payroll_records (period, code, doc) VALUES (?, ?, ?)",
+                [(period, int(key), _dumps(records[key])) for key in new_keys],
+            )
+            known.update(new_keys)
+
+    def _write_payroll_ytd(self, conn, data: dict):
+        # several MB at 100k employees: compare the revision instead of the serialized doc
+        ytd = data.get("payroll_ytd", {})
+        for fy, totals in ytd.items():
+            revision = totals.get("revision", 0)
+            if self._snapshot.get(("payroll_ytd", fy)) != revision:
+                conn.execute("INSERT OR REPLACE INTO payroll_ytd (fiscal_year, revision, doc) VALUES (?, ?, ?)",
+                             (fy, revision, _dumps(totals)))
+                self._snapshot[("payroll_ytd", fy)] = revision
+        for table, fy in list(self._snapshot):
+            if table == "payroll_ytd" and fy not in ytd:
+                conn.execute("DELETE FROM payroll_ytd WHERE fiscal_year = ?", (fy,))
+                del self._snapshot[(table, fy)]
+
+    def _write_small_tables(self, conn, data: dict):
+        wanted = set()
+        for name, role in data.get("roles", {}).items():
+            doc = _dumps(role)
+            wanted.add(("roles", name))
+            self._put(conn, "roles", name, doc, "INSERT OR REPLACE INTO roles (name, doc) VALUES (?, ?)", (name, doc))
+        for entry in data.get("payroll_history", []):
+            doc = _dumps(entry)
+            wanted.add(("payroll_history", entry["month"]))
+            self._put(conn, "payroll_history", entry["month"], doc,
+                      "INSERT OR REPLACE INTO payroll_history (month, total_expense, doc) VALUES (?, ?, ?)",
+                      (entry["month"], entry.get("total_expense"), doc))
+        for name, login in data.get("logins", {}).items():
+            doc = _dumps(login)
+            wanted.add(("logins", name))
+            self._put(conn, "logins", name, doc, "INSERT OR REPLACE INTO logins (name, username, doc) VALUES (?, ?, ?)",
+                      (name, login.get("username"), doc))
+        for key, value in data.items():
+            if key in TABLE_KEYS or key == "version":
+                continue
+            doc = _dumps(value)
+            wanted.add(("meta", key))
+            self._put(conn, "meta", key, doc, "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, doc))
+
+        # rows that disappeared from the document
+        key_columns = {"roles": "name", "payroll_history": "month", "logins": "name", "meta": "key"}
+        for table, key in list(self._snapshot):
+            if table in key_columns and (table, key) not in wanted and not (table == "meta" and key == "version"):
+                conn.execute(f"DELETE FROM {table} WHERE {key_columns[table]} = ?", (key,))
+                del self._snapshot[(table, key)]
+
+
+def migrate_json(json_path: str, db_path: str, force: bool = False) -> dict:
+    """Copy an employees.json document into a new SQLite database; returns row counts."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = compact_document(json.load(f))
+    catch_up_ytd(data)  # periods issued before the YTD totals existed
+
+    conn = connect(db_path)
+    try:
+        existing = conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0]
+        if existing and not force:
+            raise RuntimeError(f"{db_path} already holds {existing} employees (use force to overwrite)")
+
+        employees, seen = [], set()
+        for i, emp in enumerate(data.get("employees", [])):
+            code = int(emp.get("code", -1))
+            if code in seen:
+                continue  # first record wins, as in the JSON lookups
+            seen.add(code)
+            employees.append((code, i, emp.get("username"), emp.get("role"), emp.get("department"), _dumps(emp)))
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in ("employees", "roles", "payroll_history", "logins", "payroll_records", "payroll_ytd", "meta"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.executemany(
+                "INSERT INTO employees (code, position, username, role, department, doc) VALUES (?, ?, ?, ?, ?, ?)",
+                employees,
+            )
+            conn.executemany("INSERT INTO roles (name, doc) VALUES (?, ?)",
+                             [(name, _dumps(role)) for name, role in data.get("roles", {}).items()])
+            conn.executemany("INSERT OR REPLACE INTO payroll_history (month, total_expense, doc) VALUES (?, ?, ?)",
+                             [(h["month"], h.get("total_expense"), _dumps(h)) for h in data.get("payroll_history", [])])
+            conn.executemany("INSERT INTO logins (name, username, doc) VALUES (?, ?, ?)",
+                             [(name, login.get("username"), _dumps(login)) for name, login in data.get("logins", {}).items()])
+            conn.executemany("INSERT INTO payroll_records (period, code, doc) VALUES (?, ?, ?)",
+                             [(period, int(key), _dumps(record))
+                              for period, records in data.get("payroll_records", {}).items()
+                              for key, record in records.items()])
+            conn.executemany("INSERT INTO payroll_ytd (fiscal_year, revision, doc) VALUES (?, ?, ?)",
+                             [(fy, totals.get("revision", 0), _dumps(totals))
+                              for fy, totals in data.get("payroll_ytd", {}).items()])
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                             [(key, _dumps(value)) for key, value in data.items() if key not in TABLE_KEYS])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    return {
+        "employees": len(employees),
+        "roles": len(data.get("roles", {})),
+        "payroll_history": len(data.get("payroll_history", [])),
+        "logins": len(data.get("logins", {})),
+    }
@@ -0,0 +1,54 @@
+# utils/warmup.py
+"""
+Optional pre-warming of the lazily imported libraries.
+- HEAVY_MODULES: what app.py deliberately does not import at startup
+  (matplotlib via the charts, ReportLab via the payslips, NumPy via the
+  batch calculator)
+- prewarm(render=True): import them now and, optionally, render one tiny
+  chart and payslip so font caches and first-use setup are paid up front
+
+Call it in the gunicorn master (see gunicorn.conf.py, PAYROLL_PREWARM=1):
+workers forked afterwards share the loaded modules instead of each paying
+the import on its first chart / PDF request.
+"""
+
+import importlib
+import io
+import os
+import time
+
+HEAVY_MODULES = (
+    "numpy",
+    "matplotlib.figure",
+    "matplotlib.backends.backend_agg",
+    "reportlab.pdfgen.canvas",
+    "reportlab.lib.pagesizes",
+)
+
+PREWARM_ENABLED = os.environ.get("PAYROLL_PREWARM", "0").lower() in ("1", "true", "yes")
+
+def prewarm(render: bool = True) -> dict:
+    """Import HEAVY_MODULES (and render once); returns the milliseconds spent per step."""
+    timings = {}
+    for name in HEAVY_MODULES:
+        started = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    if render:
+        from utils.chart_generator import _new_figure
+        from utils.pdf_generator import render_payslip_pdf
+        from utils.salary_calculator import calculate_pay_from_hours
+
+        started = time.perf_counter()
+        fig = _new_figure((1, 1))
+        ax = fig.add_subplot()
+        ax.plot([0, 1], [0, 1])
+        ax.set_title("warmup ₹")
+        fig.savefig(io.BytesIO(), format="png")
+        timings["render_chart"] = round((time.perf_counter() - started) * 1000, 1)
+
+        started = time.perf_counter()
+        emp = {"code": 0, "name": "Warmup", "role": "-", "department": "-", "exp": 0, "working_hours": 0}
+        render_payslip_pdf(emp, calculate_pay_from_hours(0, 0, 0, 0))
+        timings["render_payslip"] = round((time.perf_counter() - started) * 1000, 1)
+    return timings